@@ -9,11 +9,19 @@ import adaptivefiltering.pdal
 # Import those functions and objects that we consider the package user API
 from adaptivefiltering.apps import pipeline_tuning
 from adaptivefiltering.asprs import asprs
+from adaptivefiltering.cache import set_cache_directory, set_cache_size
 from adaptivefiltering.dataset import DataSet, remove_classification, reproject_dataset
 from adaptivefiltering.filter import load_filter, save_filter
+from adaptivefiltering.intermediate import set_intermediate_format
+from adaptivefiltering.jobs import set_max_concurrent_jobs
 from adaptivefiltering.lastools import set_lastools_directory
 from adaptivefiltering.opals import set_opals_directory
-from adaptivefiltering.paths import set_data_directory
+from adaptivefiltering.paths import (
+    set_data_directory,
+    set_workspace_quota,
+    workspace_usage,
+)
+from adaptivefiltering.pdal import set_memory_map_threshold
 
 
 def print_version():
@@ -32,6 +40,13 @@ __all__ = [
     "load_filter",
     "save_filter",
     "set_data_directory",
+    "set_workspace_quota",
+    "workspace_usage",
+    "set_cache_directory",
+    "set_cache_size",
+    "set_memory_map_threshold",
+    "set_max_concurrent_jobs",
+    "set_intermediate_format",
     "set_lastools_directory",
     "set_opals_directory",
     "asprs",
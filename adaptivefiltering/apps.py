@@ -1,11 +1,14 @@
 from adaptivefiltering.asprs import asprs_class_name
-from adaptivefiltering.dataset import DataSet, DigitalSurfaceModel
+from adaptivefiltering.cache import cached_filter_execution
+from adaptivefiltering.dataset import RASTER_DIMENSIONS, DataSet, DigitalSurfaceModel
 from adaptivefiltering.filter import Pipeline
 from adaptivefiltering.paths import load_schema, within_temporary_workspace
 from adaptivefiltering.pdal import PDALInMemoryDataSet
 from adaptivefiltering.segmentation import Map, Segmentation
+from adaptivefiltering.visualization import DISPLAY_SIZE, image_widget
 from adaptivefiltering.widgets import WidgetForm
 
+import concurrent.futures
 import contextlib
 import copy
 import ipywidgets
@@ -115,7 +118,9 @@ def classification_widget(datasets, selected=None):
         dataset = as_pdal(dataset)
 
         # Get the lists present in this dataset
-        for code, numpoints in enumerate(np.bincount(dataset.data["Classification"])):
+        for code, numpoints in enumerate(
+            np.bincount(dataset.dimension("Classification"))
+        ):
             if numpoints > 0:
                 joined_count.setdefault(code, 0)
                 joined_count[code] += numpoints
@@ -138,9 +143,40 @@ def classification_widget(datasets, selected=None):
     )
 
 
+def preview_classification(datasets, selected):
+    """Determine the classification values to use for a preview of data sets
+
+    This follows the logic of :func:`~adaptivefiltering.apps.classification_widget`:
+    If any of the data sets contains ground points, only those are shown.
+    """
+    for dataset in datasets:
+        if np.any(as_pdal(dataset).dimension("Classification") == 2):
+            return (2,)
+    return tuple(selected)
+
+
 @pytools.memoize(key=lambda d, p: (d, p.config))
 def cached_pipeline_application(dataset, pipeline):
-    return pipeline.execute(dataset)
+    return cached_filter_execution(pipeline, dataset)
+
+
+@pytools.memoize(key=lambda d, dims: (d, dims))
+def cached_projection(dataset, dimensions):
+    return dataset.project(dimensions)
+
+
+def preview_dataset(dataset, pipeline):
+    """Load a data set with only the dimensions needed to preview a pipeline
+
+    Data sets that are already in memory are returned unchanged.
+    """
+    dimensions = pipeline.dimensions()
+    if dimensions is None or isinstance(dataset, PDALInMemoryDataSet):
+        return dataset
+
+    return cached_projection(
+        dataset, tuple(sorted(dimensions | set(RASTER_DIMENSIONS)))
+    )
 
 
 def pipeline_tuning(datasets=[], pipeline=None):
@@ -202,32 +238,62 @@ def pipeline_tuning(datasets=[], pipeline=None):
             nonlocal pipeline
             pipeline = pipeline.copy(**form.data)
 
-            # Apply the pipeline to all datasets
-            # TODO: Do this in parallel!
+            # Read the widget state upfront, widgets are not accessed from worker threads
+            selected = class_widget.children[0].value
+            rasterization_options = rasterization_widget_form.data
+            visualization_options = visualization_form.data
+
+            def _filter(dataset):
+                # Apply the pipeline to a data set
+                dataset = preview_dataset(dataset, pipeline)
+                return cached_pipeline_application(dataset, pipeline)
+
+            def _render(transformed, classification):
+                # Render a result without creating widgets
+                model = transformed.rasterize(
+                    classification=classification, **rasterization_options
+                )
+                return model.render(display_size=DISPLAY_SIZE, **visualization_options)
+
+            # Show placeholders that are replaced as soon as a dataset is done
+            new_widgets = [
+                sized_label("Currently filtering and rendering...", size=18)
+                for _ in datasets
+            ]
+            nonlocal app
+            if new_widgets:
+                app.center = create_center_widget(list(new_widgets))
+
+            # Apply the pipeline to all datasets in parallel
             with within_temporary_workspace():
-                transformed_datasets = [
-                    cached_pipeline_application(d, pipeline) for d in datasets
-                ]
+                with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(len(datasets), 1)
+                ) as executor:
+                    transformed_datasets = list(executor.map(_filter, datasets))
+
+                    # The classes to show are decided jointly for all datasets
+                    classification = preview_classification(
+                        transformed_datasets, selected
+                    )
+                    futures = {
+                        executor.submit(_render, t, classification): i
+                        for i, t in enumerate(transformed_datasets)
+                    }
+
+                    # Stream the results into the app in order of completion
+                    for future in concurrent.futures.as_completed(futures):
+                        i = futures[future]
+                        new_widgets[i] = image_widget(future.result())
+                        if len(new_widgets) > 1:
+                            app.center.children = tuple(new_widgets)
+                        else:
+                            app.center = create_center_widget(new_widgets)
 
             # Update the classification widget with the classes now present in datasets
-            selected = class_widget.children[0].value
             class_widget.children = (
                 classification_widget(transformed_datasets, selected=selected),
             )
 
-            # Write new widgets
-            new_widgets = [
-                ds.show(
-                    classification=class_widget.children[0].value,
-                    **rasterization_widget_form.data,
-                    **visualization_form.data,
-                )
-                for ds in transformed_datasets
-            ]
-
-            nonlocal app
-            app.center = create_center_widget(new_widgets)
-
     preview.on_click(_update_preview)
 
     # Create the filter configuration widget including layout tweaks
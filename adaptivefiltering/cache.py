@@ -0,0 +1,287 @@
+from adaptivefiltering.filter import Filter, serialize_filter
+from adaptivefiltering.paths import is_claimed
+
+import hashlib
+import json
+import numpy as np
+import os
+import shutil
+import uuid
+import xdg
+
+
+# Storage for the cache directory
+_cache_dir = None
+
+# The maximum size of each on-disk cache in bytes
+_cache_size = 5 * 1024**3
+
+
+def set_cache_directory(directory):
+    """Set a custom directory for persistent caches
+
+    Persistent caches store filter results computed in
+    :func:`~adaptivefiltering.pipeline_tuning` and data sets imported into
+    OPALS across sessions. By default, the XDG cache directory
+    (i.e. :code:`~/.cache/adaptivefiltering`) is used.
+
+    :param directory:
+        The custom cache directory
+    :type directory: str
+    """
+    global _cache_dir
+    _cache_dir = directory
+
+
+def set_cache_size(size):
+    """Set the maximum size of the persistent caches
+
+    If a cache exceeds this size, the least recently used entries are evicted.
+    Defaults to 5 GB per cache. A size of zero disables the caches. Cached
+    results are keyed on the versions of adaptivefiltering and the installed
+    backends and are not reused after an upgrade. The size of the session's
+    temporary files is limited separately with
+    :func:`~adaptivefiltering.set_workspace_quota`.
+
+    :param size:
+        The maximum size in bytes
+    :type size: int
+    """
+    global _cache_size
+    _cache_size = size
+
+
+def get_cache_directory():
+    """Return the root directory of the persistent caches"""
+    if _cache_dir is not None:
+        return _cache_dir
+    return os.path.join(xdg.xdg_cache_home(), "adaptivefiltering")
+
+
+def hash_filter(filter_):
+    """Compute a hash that identifies a filter configuration
+
+    :param filter_:
+        The filter to hash
+    :type filter_: adaptivefiltering.filter.Filter
+    :rtype: str
+    """
+    serialized = json.dumps(serialize_filter(filter_), sort_keys=True)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def hash_versions():
+    """Compute a hash that identifies the versions of this package and its backends
+
+    :rtype: str
+    """
+    from adaptivefiltering import __version__
+
+    versions = {"adaptivefiltering": __version__}
+    for identifier, class_ in Filter._filter_impls.items():
+        if Filter._filter_is_backend[identifier] and class_.enabled():
+            versions[identifier] = class_.backend_version()
+
+    serialized = json.dumps(versions, sort_keys=True)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, name):
+        """A size-bounded on-disk cache with least recently used eviction
+
+        Each cache entry is a single file in a subdirectory of the cache
+        directory. The access time of an entry is tracked through its
+        modification time, which is updated on every cache hit.
+
+        :param name:
+            The name of the cache, which is used as the subdirectory name.
+        :type name: str
+        """
+        self.name = name
+
+    @property
+    def directory(self):
+        return os.path.join(get_cache_directory(), self.name)
+
+    @property
+    def enabled(self):
+        return _cache_size > 0
+
+    def filename(self, key, extension):
+        """The filename that a cache entry is stored at"""
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def lookup(self, key, extension):
+        """Look up a cache entry
+
+        :return:
+            The filename of the entry or :code:`None` if it does not exist.
+        """
+        filename = self.filename(key, extension)
+        if not self.enabled or not os.path.exists(filename):
+            return None
+
+        # Mark this entry as recently used
+        os.utime(filename)
+        return filename
+
+    def insert(self, key, extension, writer):
+        """Insert a new cache entry
+
+        :param writer:
+            A callable that accepts a binary file object and writes the entry.
+        :return:
+            The filename of the entry or :code:`None` if caching is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        # Write to a temporary file first to make the insertion atomic
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self.filename(key, extension)
+        tmp_filename = os.path.join(self.directory, f".{uuid.uuid4()}.tmp")
+        with open(tmp_filename, "wb") as f:
+            writer(f)
+        os.replace(tmp_filename, filename)
+
+        self.evict(keep=filename)
+        return filename
+
+    def insert_file(self, key, extension, source):
+        """Move an existing file into the cache
+
+        :param source:
+            The file to move. If caching is disabled, it is left untouched.
+        :type source: str
+        :return:
+            The filename of the entry or :code:`None` if caching is disabled.
+        """
+        if not self.enabled:
+            return None
+
+        # Moving is atomic within the cache directory, but the source may
+        # reside on a different file system.
+        os.makedirs(self.directory, exist_ok=True)
+        filename = self.filename(key, extension)
+        tmp_filename = os.path.join(self.directory, f".{uuid.uuid4()}.tmp")
+        shutil.move(source, tmp_filename)
+        os.replace(tmp_filename, filename)
+
+        self.evict(keep=filename)
+        return filename
+
+    def entries(self):
+        """The list of cache entries as tuples of filename, size and last access"""
+        if not os.path.exists(self.directory):
+            return []
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def usage(self):
+        """The total size of all cache entries in bytes"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Evict the least recently used entries until the size limit is met
+
+        Entries that are in use by a live data set (see
+        :func:`~adaptivefiltering.paths.claim_temporary_file`) are never evicted.
+
+        :param keep:
+            The filename of an entry that must not be evicted, e.g. because
+            it was just inserted. It is kept even if it exceeds the limit alone.
+        :type keep: str
+        """
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        for filename, size, _ in entries:
+            if total <= _cache_size:
+                break
+            if filename == keep or is_claimed(filename):
+                continue
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# The cache instance for filter results
+_filter_cache = DiskCache("filter")
+
+
+def cached_filter_execution(filter_, dataset):
+    """Apply a filter to a data set using a persistent cache of results
+
+    The cache key consists of a hash of the input data set (see
+    :func:`~adaptivefiltering.DataSet.content_hash`), a hash of the serialized
+    filter configuration and a hash of the versions of this package and the
+    installed backends (see :func:`~adaptivefiltering.cache.hash_versions`). If the filter preserves the points and only modifies
+    some dimensions (e.g. the classification), only those dimensions are stored.
+    Otherwise, the full point data of the result is stored.
+
+    :param filter_:
+        The filter to apply
+    :type filter_: adaptivefiltering.filter.Filter
+    :param dataset:
+        The data set to apply the filter to
+    :type dataset: adaptivefiltering.DataSet
+    :return:
+        The filtered data set
+    :rtype: adaptivefiltering.pdal.PDALInMemoryDataSet
+    """
+    from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+    key = f"{dataset.content_hash()}-{hash_filter(filter_)}-{hash_versions()}"
+
+    # Look up the result in the cache
+    filename = _filter_cache.lookup(key, "npz")
+    if filename is not None:
+        with np.load(filename) as entry:
+            metadata = json.loads(str(entry["metadata"]))
+            if "points" in entry:
+                return PDALInMemoryDataSet(
+                    data=entry["points"],
+                    provenance=metadata["provenance"],
+                    spatial_reference=metadata["spatial_reference"],
+                )
+
+            delta = {
+                name[len("delta_") :]: entry[name]
+                for name in entry.files
+                if name.startswith("delta_")
+            }
+
+        return PDALInMemoryDataSet.from_delta(
+            PDALInMemoryDataSet.convert(dataset),
+            delta,
+            provenance=metadata["provenance"],
+            spatial_reference=metadata["spatial_reference"],
+        )
+
+    # Execute the filter and store the result
+    dataset = PDALInMemoryDataSet.convert(dataset)
+    result = PDALInMemoryDataSet.convert(filter_.execute(dataset))
+    metadata = json.dumps(
+        {
+            "provenance": result._provenance,
+            "spatial_reference": result.spatial_reference,
+        }
+    )
+
+    # Only store the modified dimensions if the result shares memory with the input
+    delta = result.delta(dataset)
+    if delta is not None:
+        arrays = {f"delta_{name}": column for name, column in delta.items()}
+    else:
+        arrays = {"points": result.data}
+
+    _filter_cache.insert(key, "npz", lambda f: np.savez(f, metadata=metadata, **arrays))
+
+    return result
@@ -0,0 +1,224 @@
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import numpy as np
+
+
+# The maximum number of point-edge pairs that are tested at once
+_BLOCK_SIZE = 2**22
+
+
+def geometry_polygons(geometry):
+    """Split a GeoJSON geometry into its polygons
+
+    :param geometry:
+        A GeoJSON geometry of type :code:`Polygon` or :code:`MultiPolygon`
+    :type geometry: dict
+    :return:
+        A list of polygons, each of which is a list of rings given as
+        arrays of shape :code:`(n, 2)`. The first ring is the exterior,
+        all further rings are holes.
+    """
+    coordinates = geometry["coordinates"]
+    if geometry["type"] == "Polygon":
+        coordinates = [coordinates]
+    elif geometry["type"] != "MultiPolygon":
+        raise AdaptiveFilteringError(
+            f"Cannot clip to geometries of type {geometry['type']}"
+        )
+
+    return [
+        [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon]
+        for polygon in coordinates
+    ]
+
+
+class PolygonIndex:
+    def __init__(self, geometries, bands=None):
+        """A vectorized point-in-polygon test for a set of geometries
+
+        Points are tested with the even-odd crossing rule. To avoid testing
+        every point against every polygon edge, the edges are sorted into
+        horizontal bands and each point is only tested against the edges of
+        the band it falls into. Points outside the bounding box of all
+        geometries are discarded upfront.
+
+        :param geometries:
+            A list of GeoJSON geometries of type :code:`Polygon` or :code:`MultiPolygon`.
+            Their position in the list is used to identify them in query results.
+        :type geometries: list
+        :param bands:
+            The number of horizontal bands. By default, this is chosen such that
+            each band contains few edges.
+        :type bands: int
+        """
+        self.size = len(geometries)
+
+        # The bounding boxes (minx, maxx, miny, maxy) of the individual geometries
+        self.geometry_bounds = []
+
+        # Collect all non-horizontal edges, together with the polygon they belong to
+        edges, polygon_ids, geometry_ids = [], [], []
+        for i, geometry in enumerate(geometries):
+            polygons = geometry_polygons(geometry)
+            vertices = np.concatenate(
+                [ring for polygon in polygons for ring in polygon]
+            )
+            minx, miny = vertices.min(axis=0)
+            maxx, maxy = vertices.max(axis=0)
+            self.geometry_bounds.append((minx, maxx, miny, maxy))
+
+            for polygon in polygons:
+                for ring in polygon:
+                    start, end = ring, np.roll(ring, -1, axis=0)
+                    ring_edges = np.concatenate([start, end], axis=1)
+                    ring_edges = ring_edges[ring_edges[:, 1] != ring_edges[:, 3]]
+                    edges.append(ring_edges)
+                    polygon_ids.append(np.full(ring_edges.shape[0], len(geometry_ids)))
+                geometry_ids.append(i)
+
+        self.edges = np.concatenate(edges) if edges else np.zeros((0, 4))
+        self.edge_polygons = (
+            np.concatenate(polygon_ids) if edges else np.zeros(0, dtype=np.int64)
+        )
+        self.polygon_geometries = np.array(geometry_ids, dtype=np.int64)
+
+        if self.edges.shape[0] == 0:
+            self.bounds = None
+            return
+
+        x = self.edges[:, [0, 2]]
+        y = self.edges[:, [1, 3]]
+        self.bounds = (x.min(), x.max(), y.min(), y.max())
+
+        # Sort the edges into the bands that their vertical extent overlaps
+        if bands is None:
+            bands = int(np.clip(self.edges.shape[0] // 4, 1, 4096))
+        self.bands = bands
+        self.band_height = max(self.bounds[3] - self.bounds[2], 1e-9) / bands
+        low = self._band(y.min(axis=1))
+        high = self._band(y.max(axis=1))
+        counts = high - low + 1
+        edge_ids = np.repeat(np.arange(self.edges.shape[0]), counts)
+        band_ids = np.repeat(low, counts) + (
+            np.arange(edge_ids.shape[0]) - np.repeat(np.cumsum(counts) - counts, counts)
+        )
+        order = np.argsort(band_ids, kind="stable")
+        self.band_edges = edge_ids[order]
+        self.band_offsets = np.searchsorted(band_ids[order], np.arange(bands + 1))
+
+    def _band(self, y):
+        band = np.floor((y - self.bounds[2]) / self.band_height).astype(np.int64)
+        return np.clip(band, 0, self.bands - 1)
+
+    def memberships(self, x, y):
+        """Determine which points are contained in which geometries
+
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :return:
+            A tuple of two integer arrays of equal length: The indices of points
+            and the indices of the geometries that contain them, sorted by
+            geometry and point. Points contained in several geometries appear
+            several times.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if self.bounds is None:
+            return empty, empty
+
+        # Bounding box prefilter
+        minx, maxx, miny, maxy = self.bounds
+        candidates = np.nonzero((x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy))[
+            0
+        ]
+
+        # Group the candidate points by band
+        bands = self._band(y[candidates])
+        order = np.argsort(bands, kind="stable")
+        candidates = candidates[order]
+        point_offsets = np.searchsorted(bands[order], np.arange(self.bands + 1))
+
+        points, polygons = [], []
+        for band in range(self.bands):
+            band_points = candidates[point_offsets[band] : point_offsets[band + 1]]
+            band_edges = self.band_edges[
+                self.band_offsets[band] : self.band_offsets[band + 1]
+            ]
+            if band_points.shape[0] == 0 or band_edges.shape[0] == 0:
+                continue
+
+            x0, y0, x1, y1 = self.edges[band_edges].T
+            block = max(_BLOCK_SIZE // band_edges.shape[0], 1)
+            for start in range(0, band_points.shape[0], block):
+                p = band_points[start : start + block]
+                px, py = x[p, np.newaxis], y[p, np.newaxis]
+
+                # A ray from the point in positive x direction crosses the edge
+                crosses = (y0 > py) != (y1 > py)
+                crosses &= px < x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+                i, j = np.nonzero(crosses)
+                points.append(p[i])
+                polygons.append(self.edge_polygons[band_edges[j]])
+
+        if not points:
+            return empty, empty
+
+        # A point is inside a polygon if it crosses an odd number of its edges
+        npolygons = self.polygon_geometries.shape[0]
+        keys, counts = np.unique(
+            np.concatenate(points) * npolygons + np.concatenate(polygons),
+            return_counts=True,
+        )
+        keys = keys[counts % 2 == 1]
+
+        # Polygons of the same geometry are merged
+        keys = np.unique(
+            self.polygon_geometries[keys % npolygons] * x.shape[0] + keys // npolygons
+        )
+        return keys % x.shape[0], keys // x.shape[0]
+
+    def labels(self, x, y):
+        """Label each point with the geometry that contains it
+
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :return:
+            An integer array with the index of the geometry that contains each point.
+            If several geometries contain a point, the first one is used. Points
+            outside all geometries are labelled with :code:`-1`.
+        :rtype: numpy.ndarray
+        """
+        points, geometries = self.memberships(x, y)
+
+        # Memberships are sorted by geometry, so the first occurrence of a point
+        # after sorting by point is the first geometry that contains it.
+        order = np.argsort(points, kind="stable")
+        points, first = np.unique(points[order], return_index=True)
+
+        labels = np.full(x.shape[0], -1, dtype=np.int64)
+        labels[points] = geometries[order][first]
+        return labels
+
+    def contains(self, x, y):
+        """Determine which points are contained in any of the geometries
+
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :return:
+            A boolean mask over the points
+        :rtype: numpy.ndarray
+        """
+        mask = np.zeros(x.shape[0], dtype=bool)
+        mask[self.memberships(x, y)[0]] = True
+        return mask
@@ -1,11 +1,27 @@
 from adaptivefiltering.asprs import asprs
-from adaptivefiltering.paths import locate_file, get_temporary_filename, load_schema
+from adaptivefiltering.intermediate import get_intermediate_filename
+from adaptivefiltering.lasheader import read_las_header
+from adaptivefiltering.paths import (
+    claim_temporary_file,
+    get_temporary_filename,
+    load_schema,
+    locate_file,
+)
+from adaptivefiltering.rasterization import (
+    aggregate_raster,
+    create_gdal_raster,
+    fill_nodata,
+)
 from adaptivefiltering.utils import AdaptiveFilteringError, check_spatial_reference
-from adaptivefiltering.visualization import gdal_visualization
+from adaptivefiltering.visualization import (
+    DISPLAY_SIZE,
+    cached_render_visualization,
+    image_widget,
+)
 
 from osgeo import gdal
 
-import ipywidgets
+import hashlib
 import json
 import jsonschema
 import os
@@ -16,6 +32,9 @@ import tempfile
 
 
 class DataSet:
+    # Whether the save method of this class supports LAZ compression
+    _laz_export = True
+
     def __init__(self, filename=None, provenance=[], spatial_reference=None):
         """The main class that represents a Lidar data set.
         :param filename:
@@ -45,7 +64,7 @@ class DataSet:
             self.filename = locate_file(self.filename)
 
     @pytools.memoize_method
-    def rasterize(self, resolution=0.5, classification=None):
+    def rasterize(self, resolution=0.5, classification=None, engine="numpy"):
         """Create a digital terrain model from the dataset
 
         It is important to note that for archaelogic applications, the mesh is not
@@ -61,15 +80,32 @@ class DataSet:
         :param classification:
             The classification values to include into the written mesh file.
         :type classification: tuple
+        :param engine:
+            The rasterization engine, see :class:`~adaptivefiltering.dataset.DigitalSurfaceModel`.
+        :type engine: str
         """
         # If no classification value was given, we use all classes
         if classification is None:
             classification = asprs[:]
 
         return DigitalSurfaceModel(
-            dataset=self, resolution=resolution, classification=classification
+            dataset=self._raster_points(),
+            engine=engine,
+            resolution=resolution,
+            classification=classification,
         )
 
+    @pytools.memoize_method
+    def _raster_points(self):
+        """The points needed for rasterization, loaded into memory once
+
+        Rasterizations with different options, e.g. when toggling classes in
+        the interactive visualization, thereby do not read the file again.
+        """
+        from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+        return PDALInMemoryDataSet.convert(self, dimensions=RASTER_DIMENSIONS)
+
     def show(self, visualization_type="hillshade", **kwargs):
         """Visualize the dataset in JupyterLab
         Several visualization options can be chosen via the *visualization_type* parameter.
@@ -167,10 +203,124 @@ class DataSet:
         """
         from adaptivefiltering.pdal import PDALInMemoryDataSet
 
+        # The segmentation map only needs the footprint of this data set, so
+        # the points are not loaded before a segmentation was chosen.
+        if segmentation is None:
+            from adaptivefiltering.apps import create_segmentation
+
+            restricted = create_segmentation(self)
+            restricted._finalization_hook = lambda seg: PDALInMemoryDataSet.convert(
+                self
+            ).restrict(seg)
+
+            return restricted
+
         dataset = PDALInMemoryDataSet.convert(self)
 
         return dataset.restrict(segmentation)
 
+    def restrict_segments(self, segmentation):
+        """Restrict the data set to each segment of a segmentation
+
+        All segments are processed in a single pass over the points, which is
+        much faster than calling :func:`~adaptivefiltering.DataSet.restrict`
+        for each segment separately. Points that are contained in several
+        segments are part of each of the resulting data sets.
+
+        :param segmentation:
+            The segmentation whose features define the segments
+        :type segmentation: adaptivefiltering.segmentation.Segmentation
+        :return:
+            A list with one restricted data set per feature of the segmentation
+        :rtype: list
+        """
+        from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+        return PDALInMemoryDataSet.convert(self).restrict_segments(segmentation)
+
+    def segment_labels(self, segmentation):
+        """Determine the segment that each point belongs to
+
+        :param segmentation:
+            The segmentation whose features define the segments
+        :type segmentation: adaptivefiltering.segmentation.Segmentation
+        :return:
+            An integer array with the index of the feature that contains each
+            point. If several features contain a point, the first one is used.
+            Points outside all features are labelled with :code:`-1`.
+        :rtype: numpy.ndarray
+        """
+        from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+        return PDALInMemoryDataSet.convert(self).segment_labels(segmentation)
+
+    @pytools.memoize_method
+    def content_hash(self):
+        """A hash that identifies the content of this data set
+
+        For file-backed data sets, this is computed from the absolute filename,
+        the modification time and the file size, so the file content is not read.
+        It is used as a key for persistent caches.
+
+        :rtype: str
+        """
+        stat = os.stat(self.filename)
+        key = f"{self.filename}:{stat.st_mtime_ns}:{stat.st_size}:{self.spatial_reference}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @pytools.memoize_method
+    def header(self):
+        """Inspect the data set without loading its points
+
+        For file-backed data sets, only the LAS/LAZ header and the variable
+        length records are read, which takes constant time regardless of the
+        file size.
+
+        :return:
+            The header information, see :class:`~adaptivefiltering.lasheader.LASHeader`
+        :rtype: adaptivefiltering.lasheader.LASHeader
+        """
+        if type(self) is not DataSet:
+            return DataSet.convert(self).header()
+
+        return read_las_header(self.filename)
+
+    @pytools.memoize_method
+    def footprint(self):
+        """The outline of the area covered by the data set
+
+        The footprint is traced from a coarse occupancy grid. For file-backed
+        data sets, the grid is populated from a sample of the points and the
+        result is cached persistently, so that the data set is not read in full.
+
+        :return:
+            A GeoJSON polygon geometry in the spatial reference system of the data set
+        :rtype: dict
+        """
+        from adaptivefiltering.footprint import file_footprint
+
+        if type(self) is not DataSet:
+            return DataSet.convert(self).footprint()
+
+        return file_footprint(self)
+
+    def project(self, dimensions):
+        """Load the data set into memory, restricted to the given point dimensions
+
+        Only the given dimensions are materialized, which considerably reduces
+        the memory usage per point. The data is read in chunks, so that the
+        full point data is never held in memory. Filters report the dimensions
+        they need through :func:`~adaptivefiltering.filter.Filter.dimensions`.
+
+        :param dimensions:
+            The names of the dimensions to keep, e.g. :code:`("X", "Y", "Z", "Classification")`
+        :type dimensions: tuple
+        :rtype: adaptivefiltering.pdal.PDALInMemoryDataSet
+        """
+        from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+        return PDALInMemoryDataSet.convert(self, dimensions=tuple(dimensions))
+
     def provenance(self, stream=sys.stdout):
         """Report the provence of this data set
         For the given data set instance, report the input data and filter
@@ -189,28 +339,86 @@ class DataSet:
 
     @classmethod
     def convert(cls, dataset):
-        """Convert this dataset to an instance of DataSet"""
-        return dataset.save(get_temporary_filename(extension="las"))
+        """Convert this dataset to an instance of DataSet
+
+        File-backed data sets are returned as they are, so that backends read
+        them directly from their original location. None of the backends modify
+        their input file. All other data sets are written to a file in the
+        temporary workspace, see :func:`~adaptivefiltering.set_intermediate_format`,
+        that is deleted together with the returned data set.
+        """
+        # Conversion should be idempotent
+        if type(dataset) is DataSet and dataset.filename is not None:
+            return dataset
+
+        filename = get_intermediate_filename(compress=dataset._laz_export)
+        converted = dataset.save(filename, compress=filename.endswith(".laz"))
+        claim_temporary_file(converted.filename, converted)
+        return converted
+
+
+# The point dimensions that are used for rasterization
+RASTER_DIMENSIONS = ("X", "Y", "Z", "Classification")
 
 
 class DigitalSurfaceModel:
-    def __init__(self, dataset=None, **rasterization_options):
+    def __init__(self, dataset=None, engine="numpy", **rasterization_options):
         """Representation of a rasterized DEM/DTM/DSM/DFM
 
         Constructs a raster model from a dataset. This is typically used
         implicitly or through :ref:`~adaptivefilter.DataSet.rasterize`.
+
+        :param engine:
+            The rasterization engine to use. With :code:`numpy`, the points are
+            binned in-process into an in-memory GDAL dataset. With :code:`pdal`,
+            PDAL writes a GeoTIFF file to the temporary workspace, which is
+            slower, but uses a triangulation for ground-only rasters.
+        :type engine: str
         """
 
-        from adaptivefiltering.pdal import PDALInMemoryDataSet, execute_pdal_pipeline
+        from adaptivefiltering.pdal import PDALInMemoryDataSet
 
-        # Store a reference to the generating dataset
-        self.dataset = PDALInMemoryDataSet.convert(dataset)
+        # Store a reference to the generating dataset. Files are loaded with
+        # only those dimensions that are needed for rasterization.
+        self.dataset = PDALInMemoryDataSet.convert(
+            dataset, dimensions=RASTER_DIMENSIONS
+        )
 
         # Validate the provided options
         schema = load_schema("rasterize.json")
         jsonschema.validate(
             rasterization_options, schema=schema, types=dict(array=(list, tuple))
         )
+        classification = tuple(rasterization_options.get("classification", asprs[:]))
+        resolution = rasterization_options.get("resolution", 0.5)
+
+        # The file that the raster is stored in, if any
+        self.filename = None
+
+        if engine == "numpy":
+            self.raster = self._rasterize_numpy(classification, resolution)
+        elif engine == "pdal":
+            self.raster = self._rasterize_pdal(classification, resolution)
+        else:
+            raise AdaptiveFilteringError(f"Unknown rasterization engine '{engine}'")
+
+    def _rasterize_numpy(self, classification, resolution):
+        # The cell statistics are shared between all classification subsets
+        statistics = self.dataset.cell_statistics(resolution)
+        rasters = statistics.rasterize(classification)
+        geotransform = statistics.index.geotransform
+        raster = create_gdal_raster(
+            rasters, geotransform, spatial_reference=self.dataset.spatial_reference
+        )
+
+        # If we are only using ground, we close gaps like a triangulation would
+        if classification == (2,):
+            fill_nodata(raster)
+
+        return raster
+
+    def _rasterize_pdal(self, classification, resolution):
+        from adaptivefiltering.pdal import execute_pdal_pipeline
 
         # Get a temporary filename to write the geotiff to
         self.filename = get_temporary_filename()
@@ -219,15 +427,12 @@ class DigitalSurfaceModel:
         config = [
             {
                 "type": "filters.range",
-                "limits": ",".join(
-                    f"Classification[{c}:{c}]"
-                    for c in rasterization_options.get("classification", asprs[:])
-                ),
+                "limits": ",".join(f"Classification[{c}:{c}]" for c in classification),
             }
         ]
 
         # If we are only using ground, we use a triangulation approach
-        if tuple(rasterization_options.get("classification", asprs[:])) == (2,):
+        if classification == (2,):
             config.extend(
                 [
                     {
@@ -235,7 +440,7 @@ class DigitalSurfaceModel:
                     },
                     {
                         "type": "filters.faceraster",
-                        "resolution": rasterization_options.get("resolution", 0.5),
+                        "resolution": resolution,
                     },
                     {
                         "type": "writers.raster",
@@ -251,31 +456,96 @@ class DigitalSurfaceModel:
                     "gdaldriver": "GTiff",
                     "output_type": "all",
                     "type": "writers.gdal",
-                    "resolution": rasterization_options.get("resolution", 0.5),
+                    "resolution": resolution,
                 }
             )
 
-        # Create the model by running the pipeline
-        execute_pdal_pipeline(
-            dataset=self.dataset,
-            config=config,
+        # Create the model by running the pipeline. The file is claimed once
+        # written, so that its size counts towards the workspace quota.
+        try:
+            execute_pdal_pipeline(
+                dataset=self.dataset,
+                config=config,
+            )
+        finally:
+            claim_temporary_file(self.filename, self)
+
+        return gdal.Open(self.filename, gdal.GA_ReadOnly)
+
+    @pytools.memoize_method
+    def pyramid_level(self, level):
+        """Access a level of the raster pyramid of this model
+
+        Level 0 is the raster at the requested resolution. Each further level
+        halves the resolution by aggregating blocks of 2x2 cells of the previous
+        level. Levels are computed on first access.
+
+        :param level:
+            The pyramid level
+        :type level: int
+        :return:
+            A GDAL dataset
+        """
+        if level == 0:
+            return self.raster
+        return aggregate_raster(self.pyramid_level(level - 1))
+
+    def select_level(self, display_size=None):
+        """Select the coarsest pyramid level that still fills a given display size
+
+        :param display_size:
+            The size in pixels that the longer edge of the raster is displayed at.
+            If omitted, the full resolution level 0 is selected.
+        :type display_size: int
+        :rtype: int
+        """
+        if display_size is None:
+            return 0
+
+        level = 0
+        size = max(self.raster.RasterXSize, self.raster.RasterYSize)
+        while (size + 1) // 2 >= display_size:
+            size = (size + 1) // 2
+            level = level + 1
+        return level
+
+    def render(self, visualization_type="hillshade", display_size=None, **kwargs):
+        """Render a visualization of this model into a PNG image
+
+        This does not create any widgets and can therefore be safely called
+        from worker threads. The arguments are the same as for
+        :func:`~adaptivefiltering.dataset.DigitalSurfaceModel.show`.
+
+        :param display_size:
+            The size in pixels that the image is displayed at. If given, the
+            coarsest level of the raster pyramid that fills this size is rendered
+            instead of the full resolution raster.
+        :type display_size: int
+        :return:
+            The PNG encoded image
+        :rtype: bytes
+        """
+        # Renderings are cached, so returning to previous settings is cheap
+        raster = self.pyramid_level(self.select_level(display_size))
+        return cached_render_visualization(
+            raster, visualization_type=visualization_type, **kwargs
         )
 
-        self.raster = gdal.Open(self.filename, gdal.GA_ReadOnly)
+    def show(self, visualization_type="hillshade", display_size=DISPLAY_SIZE, **kwargs):
+        """Visualize this model in JupyterLab
 
-    def show(self, visualization_type="hillshade", **kwargs):
-        # Validate the visualization input
-        kwargs["visualization_type"] = visualization_type
-        schema = load_schema("visualization.json")
-        jsonschema.validate(kwargs, schema=schema)
-
-        # Call the correct visualization function
-        vis = gdal_visualization(self, **kwargs)
-        vis.layout = ipywidgets.Layout(width="70%")
-        box_layout = ipywidgets.Layout(
-            width="100%", flex_flow="column", align_items="center", display="flex"
+        The arguments are the same as for :func:`~adaptivefiltering.DataSet.show`.
+        Images are rendered from the coarsest level of the raster pyramid that
+        fills the given display size. Pass :code:`display_size=None` to render
+        at full resolution.
+        """
+        return image_widget(
+            self.render(
+                visualization_type=visualization_type,
+                display_size=display_size,
+                **kwargs,
+            )
         )
-        return ipywidgets.HBox(children=[vis], layout=box_layout)
 
 
 def remove_classification(dataset):
@@ -290,18 +560,24 @@ def remove_classification(dataset):
         A transformed dataset with unclassified points
     :rtype: adaptivefiltering.DataSet
     """
-    from adaptivefiltering.pdal import PDALInMemoryDataSet, execute_pdal_pipeline
+    from adaptivefiltering.pdal import (
+        PDALInMemoryDataSet,
+        execute_pdal_pipeline,
+        extract_pdal_array,
+    )
 
     dataset = PDALInMemoryDataSet.convert(dataset)
-    pipeline = execute_pdal_pipeline(
-        dataset=dataset,
-        config={"type": "filters.assign", "value": ["Classification = 1"]},
+    data = extract_pdal_array(
+        execute_pdal_pipeline(
+            dataset=dataset,
+            config={"type": "filters.assign", "value": ["Classification = 1"]},
+        )
     )
 
-    return PDALInMemoryDataSet(
-        pipeline=pipeline,
+    return PDALInMemoryDataSet.derive(
+        dataset,
+        data,
         provenance=dataset._provenance + ["Removed all point classifications"],
-        spatial_reference=dataset.spatial_reference,
     )
 
 
@@ -315,7 +591,7 @@ def reproject_dataset(dataset, out_srs, in_srs=None):
     :return: A reprojected dataset
     :rtype: adaptivefiltering.DataSet
     """
-    from adaptivefiltering.pdal import execute_pdal_pipeline
+    from adaptivefiltering.pdal import execute_pdal_pipeline, extract_pdal_array
     from adaptivefiltering.pdal import PDALInMemoryDataSet
 
     dataset = PDALInMemoryDataSet.convert(dataset)
@@ -331,8 +607,14 @@ def reproject_dataset(dataset, out_srs, in_srs=None):
     spatial_reference = json.loads(pipeline.metadata)["metadata"][
         "filters.reprojection"
     ]["comp_spatialreference"]
-    return PDALInMemoryDataSet(
-        pipeline=pipeline,
+
+    # Release the pipeline and with it PDAL's copy of the points
+    data = extract_pdal_array(pipeline)
+    del pipeline
+
+    return PDALInMemoryDataSet.derive(
+        dataset,
+        data,
         provenance=dataset._provenance
         + [f"Converted the dataset to spatial reference system '{out_srs}'"],
         spatial_reference=spatial_reference,
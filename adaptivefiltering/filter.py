@@ -88,6 +88,19 @@ class Filter:
         """
         raise NotImplementedError  # pragma: no cover
 
+    def dimensions(self):
+        """The point dimensions that this filter reads
+
+        Backends can use this information to avoid loading dimensions that
+        are not needed. See :func:`~adaptivefiltering.DataSet.project`.
+
+        :return:
+            A set of dimension names or :code:`None` if the filter might read
+            any dimension.
+        :rtype: frozenset
+        """
+        return None
+
     def _serialize(self):
         """Serialize this filter.
 
@@ -185,6 +198,15 @@ class Filter:
     def enabled(cls):
         return True
 
+    @classmethod
+    def backend_version(cls):
+        """A string that identifies the installed version of the backend
+
+        It is part of the keys of persistent caches, so that cached results
+        are not reused after the backend was upgraded.
+        """
+        return ""
+
 
 # Register the base class itself
 Filter._filter_impls["base"] = Filter
@@ -204,7 +226,8 @@ class PipelineMixin:
         filters = []
         for f in kwargs.get("filters", []):
             if isinstance(f, Filter):
-                filters.append(f.config)
+                # Keep the backend information to allow deserialization
+                filters.append(serialize_filter(f))
             else:
                 filters.append(f)
         kwargs["filters"] = filters
@@ -247,6 +270,15 @@ class PipelineMixin:
     def as_pipeline(self):
         return self
 
+    def dimensions(self):
+        dimensions = frozenset()
+        for f in self.config["filters"]:
+            fdims = deserialize_filter(pyrsistent.thaw(f)).dimensions()
+            if fdims is None:
+                return None
+            dimensions = dimensions | fdims
+        return dimensions
+
     def __add__(self, other):
         return type(self)(
             filters=self.config["filters"] + other.as_pipeline().config["filters"]
@@ -274,13 +306,71 @@ class PipelineMixin:
 
 
 class Pipeline(PipelineMixin, Filter, identifier="pipeline", backend=False):
-    def execute(self, dataset):
-        for f in self.config["filters"]:
-            fobj = deserialize_filter(pyrsistent.thaw(f))
+    def execute(self, dataset, tile_size=None, tile_buffer=20.0):
+        """Apply the pipeline to a given data set
+
+        :param dataset:
+            The data set to apply the pipeline to.
+        :type dataset: adaptivefiltering.DataSet
+        :param tile_size:
+            If given, the pipeline is executed out-of-core on square tiles of
+            this edge length (in units of the spatial reference system). This
+            bounds the memory usage by the tile size instead of the data set size.
+            See :func:`~adaptivefiltering.tiling.execute_tiled` for details.
+        :type tile_size: float
+        :param tile_buffer:
+            The width of the overlap buffer around each tile. This should exceed
+            the size of the neighborhood that the filters take into account.
+            Only used if :code:`tile_size` is given.
+        :type tile_buffer: float
+        :return:
+            A modified data set instance with the pipeline applied.
+        """
+        if tile_size is not None:
+            from adaptivefiltering.tiling import execute_tiled
+
+            return execute_tiled(
+                self, dataset, tile_size=tile_size, tile_buffer=tile_buffer
+            )
+
+        for fobj in self.plan():
             dataset = fobj.execute(dataset)
 
         return dataset
 
+    def plan(self):
+        """Determine how the filters of this pipeline are executed
+
+        Consecutive filters of a backend that has its own pipeline implementation
+        (e.g. PDAL) are fused into a single pipeline of that backend. Such groups
+        are executed in one go, so that the data set is only marshalled once
+        per group instead of once per filter. Filters of other backends are
+        executed one by one.
+
+        :return:
+            The list of filters that are applied in order
+        :rtype: list
+        """
+        plan = []
+        for f in self.config["filters"]:
+            fobj = deserialize_filter(pyrsistent.thaw(f))
+            if plan and _fusable(plan[-1], fobj):
+                plan[-1] = plan[-1] + fobj
+            else:
+                plan.append(fobj)
+
+        return plan
+
+
+def _fusable(first, second):
+    """Whether two filters can be fused into a pipeline of their backend"""
+    pipeline = first.as_pipeline()
+    return (
+        isinstance(pipeline, PipelineMixin)
+        and not isinstance(pipeline, Pipeline)
+        and type(second.as_pipeline()) is type(pipeline)
+    )
+
 
 def serialize_filter(filter_):
     """Serialize a given filter.
@@ -0,0 +1,227 @@
+from adaptivefiltering.cache import DiskCache
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+from osgeo import gdal, ogr
+
+import json
+import math
+import numpy as np
+
+
+# The number of occupancy grid cells along the longer side of a data set
+FOOTPRINT_GRID_SIZE = 128
+
+# The number of points that are sampled from files to estimate their footprint
+FOOTPRINT_SAMPLE_SIZE = 1_000_000
+
+# The number of evenly spaced windows that file samples are drawn from
+FOOTPRINT_SAMPLE_WINDOWS = 256
+
+# The cache instance for footprints of file-backed data sets
+_footprint_cache = DiskCache("footprint")
+
+
+def occupancy_grid(x, y, bounds, grid_size=FOOTPRINT_GRID_SIZE):
+    """Mark the cells of a coarse grid that contain at least one point
+
+    :param x:
+        The x coordinates of the points
+    :type x: numpy.ndarray
+    :param y:
+        The y coordinates of the points
+    :type y: numpy.ndarray
+    :param bounds:
+        The bounding box :code:`(minx, maxx, miny, maxy)` that the grid covers
+    :type bounds: tuple
+    :param grid_size:
+        The number of cells along the longer side of the bounding box
+    :type grid_size: int
+    :return:
+        A tuple of the boolean occupancy raster (first row is the northernmost
+        one) and its GDAL geotransform
+    """
+    minx, maxx, miny, maxy = bounds
+    resolution = max(maxx - minx, maxy - miny, 1e-9) / grid_size
+    width = max(int(math.ceil((maxx - minx) / resolution)), 1)
+    height = max(int(math.ceil((maxy - miny) / resolution)), 1)
+    geotransform = (minx, resolution, 0.0, miny + height * resolution, 0.0, -resolution)
+
+    col = np.clip(((x - minx) / resolution).astype(np.int64), 0, width - 1)
+    row = np.clip(((geotransform[3] - y) / resolution).astype(np.int64), 0, height - 1)
+    occupied = np.zeros(height * width, dtype=bool)
+    occupied[row * width + col] = True
+    return occupied.reshape(height, width), geotransform
+
+
+def close_occupancy(occupied):
+    """Fill gaps of single cells in an occupancy raster
+
+    Sampled points do not hit every cell of the data set, which would lead to
+    holes and ragged edges in the footprint. This applies a morphological
+    closing with a 3x3 neighborhood.
+
+    :param occupied:
+        The boolean occupancy raster
+    :type occupied: numpy.ndarray
+    """
+
+    def neighborhoods(raster, fill):
+        padded = np.pad(raster, 1, constant_values=fill)
+        height, width = raster.shape
+        for i in range(3):
+            for j in range(3):
+                yield padded[i : i + height, j : j + width]
+
+    dilated = np.logical_or.reduce(list(neighborhoods(occupied, False)))
+    closed = np.logical_and.reduce(list(neighborhoods(dilated, True)))
+    return closed | occupied
+
+
+def footprint_polygon(occupied, geotransform):
+    """Trace the outline of the occupied cells of an occupancy raster
+
+    :param occupied:
+        The boolean occupancy raster
+    :type occupied: numpy.ndarray
+    :param geotransform:
+        The GDAL geotransform of the raster
+    :type geotransform: tuple
+    :return:
+        A GeoJSON polygon geometry with a single ring
+    :rtype: dict
+    """
+    height, width = occupied.shape
+    raster = gdal.GetDriverByName("MEM").Create("", width, height, 1, gdal.GDT_Byte)
+    raster.SetGeoTransform(geotransform)
+    band = raster.GetRasterBand(1)
+    band.WriteArray(occupied.astype(np.uint8))
+
+    # Polygonize all occupied cells, the band serves as its own mask
+    source = ogr.GetDriverByName("Memory").CreateDataSource("")
+    layer = source.CreateLayer("footprint")
+    layer.CreateField(ogr.FieldDefn("value", ogr.OFTInteger))
+    gdal.Polygonize(band, band, layer, 0)
+
+    polygon = ogr.Geometry(ogr.wkbMultiPolygon)
+    for feature in layer:
+        polygon.AddGeometry(feature.GetGeometryRef())
+    if polygon.GetGeometryCount() == 0:
+        raise AdaptiveFilteringError(
+            "Cannot determine the footprint of an empty data set"
+        )
+
+    # Disconnected regions (e.g. from a sparse sample) are enclosed by their
+    # convex hull, so that the footprint is always a single polygon.
+    polygon = polygon.UnionCascaded()
+    if polygon.GetGeometryType() != ogr.wkbPolygon:
+        polygon = polygon.ConvexHull()
+
+    # Holes are irrelevant for an outline, so only the exterior ring is kept.
+    # Simplification removes the staircase pattern of the raster cells.
+    polygon = polygon.SimplifyPreserveTopology(geotransform[1])
+    ring = polygon.GetGeometryRef(0)
+    return {
+        "type": "Polygon",
+        "coordinates": [[[p[0], p[1]] for p in ring.GetPoints()]],
+    }
+
+
+def compute_footprint(x, y, bounds, grid_size=FOOTPRINT_GRID_SIZE):
+    """Compute the footprint of a set of points
+
+    :param x:
+        The x coordinates of the points
+    :type x: numpy.ndarray
+    :param y:
+        The y coordinates of the points
+    :type y: numpy.ndarray
+    :param bounds:
+        The bounding box :code:`(minx, maxx, miny, maxy)` of the data set
+    :type bounds: tuple
+    :param grid_size:
+        The number of occupancy grid cells along the longer side of the bounding box
+    :type grid_size: int
+    :return:
+        A GeoJSON polygon geometry in the coordinates of the points
+    :rtype: dict
+    """
+    occupied, geotransform = occupancy_grid(x, y, bounds, grid_size=grid_size)
+    return footprint_polygon(close_occupancy(occupied), geotransform)
+
+
+def read_las_sample(filename, count, sample_size=FOOTPRINT_SAMPLE_SIZE):
+    """Read the coordinates of a sample of the points of a LAS/LAZ file
+
+    The sample consists of :code:`FOOTPRINT_SAMPLE_WINDOWS` windows of
+    consecutive points that are evenly spaced throughout the file. As
+    acquisition order is spatially coherent, this covers the entire
+    extent of the data set without reading all of its points.
+
+    :param filename:
+        The LAS/LAZ file to read from
+    :type filename: str
+    :param count:
+        The number of points in the file
+    :type count: int
+    :param sample_size:
+        The approximate number of points to read
+    :type sample_size: int
+    :return:
+        A tuple of arrays with the x and y coordinates of the sample
+    """
+    from adaptivefiltering.pdal import execute_pdal_pipeline, extract_pdal_array
+
+    if count <= sample_size:
+        starts, window = [0], count
+    else:
+        window = max(sample_size // FOOTPRINT_SAMPLE_WINDOWS, 1)
+        starts = np.linspace(0, count - window, FOOTPRINT_SAMPLE_WINDOWS).astype(int)
+
+    x, y = [], []
+    for start in starts:
+        chunk = extract_pdal_array(
+            execute_pdal_pipeline(
+                config=[
+                    {
+                        "type": "readers.las",
+                        "filename": filename,
+                        "start": int(start),
+                        "count": int(window),
+                    }
+                ]
+            )
+        )
+        x.append(chunk["X"])
+        y.append(chunk["Y"])
+
+    return np.concatenate(x), np.concatenate(y)
+
+
+def file_footprint(dataset):
+    """Determine the footprint of a file-backed data set
+
+    The footprint is estimated from a sample of the points, see
+    :func:`~adaptivefiltering.footprint.read_las_sample`, and stored
+    in a persistent cache, so that it is computed only once per file.
+
+    :param dataset:
+        The file-backed data set
+    :type dataset: adaptivefiltering.DataSet
+    :return:
+        A GeoJSON polygon geometry in the spatial reference system of the data set
+    :rtype: dict
+    """
+    key = f"{dataset.content_hash()}-{FOOTPRINT_GRID_SIZE}-{FOOTPRINT_SAMPLE_SIZE}"
+    filename = _footprint_cache.lookup(key, "json")
+    if filename is not None:
+        with open(filename, "r") as f:
+            return json.load(f)
+
+    header = dataset.header()
+    x, y = read_las_sample(dataset.filename, header.count)
+    footprint = compute_footprint(x, y, header.bounds[:4])
+
+    _footprint_cache.insert(
+        key, "json", lambda f: f.write(json.dumps(footprint).encode())
+    )
+    return footprint
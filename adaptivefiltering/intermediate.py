@@ -0,0 +1,122 @@
+from adaptivefiltering.paths import get_temporary_filename, get_temporary_workspace
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import numpy as np
+import os
+import shutil
+import tempfile
+import time
+
+
+# The file formats that can be used to exchange point data between backends
+INTERMEDIATE_FORMATS = ("las", "laz")
+
+# The currently selected intermediate format
+_intermediate_format = "las"
+
+
+def set_intermediate_format(format):
+    """Set the file format used to exchange point data between backends
+
+    Backends like OPALS and LASTools, as well as tiled execution, exchange
+    point data through files in the temporary workspace. Uncompressed LAS
+    is fastest on local disks. On slow (e.g. network-mounted) disks, the
+    smaller LAZ files are typically faster. Use
+    :func:`~adaptivefiltering.intermediate.benchmark_intermediate_formats`
+    to compare the formats on a given system.
+
+    :param format:
+        Either :code:`las` or :code:`laz`
+    :type format: str
+    """
+    if format not in INTERMEDIATE_FORMATS:
+        raise AdaptiveFilteringError(
+            f"Unknown intermediate format '{format}', use one of {', '.join(INTERMEDIATE_FORMATS)}"
+        )
+
+    global _intermediate_format
+    _intermediate_format = format
+
+
+def get_intermediate_filename(compress=True):
+    """Create a temporary filename for point data in the intermediate format
+
+    :param compress:
+        Whether the writer supports LAZ. If not, LAS is used regardless of
+        the selected format.
+    :type compress: bool
+    """
+    if _intermediate_format == "laz" and compress:
+        return get_temporary_filename(extension="laz")
+    return get_temporary_filename(extension="las")
+
+
+def _directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def benchmark_intermediate_formats(dataset, formats=("las", "laz", "npy")):
+    """Measure the write and read throughput of point data file formats
+
+    The point data is written to and read from the temporary workspace. Next
+    to the intermediate formats, the raw columnar NumPy format (one
+    :code:`.npy` file per dimension) is measured as a baseline. It is not
+    available as an intermediate format, because OPALS and LASTools
+    cannot read it.
+
+    :param dataset:
+        The data set to use for the benchmark
+    :type dataset: adaptivefiltering.DataSet
+    :param formats:
+        The formats to measure
+    :type formats: tuple
+    :return:
+        A dictionary mapping each format to a dictionary with the write and
+        read throughput in bytes of point data per second and the size on disk.
+    :rtype: dict
+    """
+    from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+    dataset = PDALInMemoryDataSet.convert(dataset)
+    names = dataset.data.dtype.names
+    nbytes = dataset.data.nbytes
+
+    results = {}
+    for format in formats:
+        if format == "npy":
+            path = tempfile.mkdtemp(dir=get_temporary_workspace())
+
+            start = time.perf_counter()
+            for name in names:
+                np.save(os.path.join(path, f"{name}.npy"), dataset.dimension(name))
+            write = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for name in names:
+                np.load(os.path.join(path, f"{name}.npy"))
+            read = time.perf_counter() - start
+        else:
+            path = get_temporary_filename(extension=format)
+
+            start = time.perf_counter()
+            saved = dataset.save(path, compress=format == "laz")
+            write = time.perf_counter() - start
+
+            start = time.perf_counter()
+            PDALInMemoryDataSet.convert(saved)
+            read = time.perf_counter() - start
+
+        results[format] = {
+            "write": nbytes / write,
+            "read": nbytes / read,
+            "size": _directory_size(path),
+        }
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    return results
@@ -0,0 +1,268 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import ipywidgets
+import os
+import re
+import subprocess
+import threading
+
+
+# The maximum number of external processes and filter jobs that run at once
+_max_concurrent_jobs = os.cpu_count() or 1
+
+# The number of bytes of process output that are read at once
+_READ_SIZE = 2**16
+
+# The event loop that external processes are run on. It runs in a background
+# thread, so that it is independent of the event loop of a Jupyter kernel.
+_loop = None
+_loop_lock = threading.Lock()
+
+# The semaphore that limits the number of concurrent processes. It is created
+# lazily, because it needs to be created on the thread of the event loop.
+_semaphore = None
+
+# The thread pool that filter jobs are submitted to
+_executor = None
+
+# The handler for the output of external processes, per thread
+_output = threading.local()
+
+
+def set_max_concurrent_jobs(jobs):
+    """Set the maximum number of concurrently running backend jobs
+
+    This limits both the number of external processes (e.g. OPALS modules or
+    LASTools executables) and the number of filter executions submitted with
+    :func:`~adaptivefiltering.jobs.submit_filter` that run at the same time.
+    Defaults to the number of CPUs.
+
+    :param jobs:
+        The maximum number of concurrent jobs
+    :type jobs: int
+    """
+    global _max_concurrent_jobs, _semaphore, _executor
+    _max_concurrent_jobs = jobs
+
+    # Running jobs finish with the previous limit
+    _semaphore = None
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+    return _loop
+
+
+def _job_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_max_concurrent_jobs)
+    return _semaphore
+
+
+@contextlib.contextmanager
+def job_output(handler):
+    """Forward the output of external processes started in this thread
+
+    :param handler:
+        A callable that is called with every line of output as a string
+    :type handler: callable
+    """
+    previous = getattr(_output, "handler", None)
+    _output.handler = handler
+    try:
+        yield
+    finally:
+        _output.handler = previous
+
+
+def _split_lines(buffer):
+    """Split the complete lines off a buffer of process output
+
+    Lines may be terminated by a carriage return, which progress bars
+    commonly use to overwrite the current line.
+
+    :return:
+        A tuple of the list of complete lines and the remaining buffer
+    """
+    lines = re.findall(rb"[^\r\n]*(?:\r\n|\r|\n)", buffer)
+    return lines, buffer[sum(len(line) for line in lines) :]
+
+
+async def run_process(args, cwd=None, on_output=None):
+    """Run an external process and stream its output
+
+    The process waits for a free slot if the maximum number of concurrent
+    jobs is reached, see :func:`~adaptivefiltering.jobs.set_max_concurrent_jobs`.
+
+    :param args:
+        The command line of the process
+    :type args: list
+    :param cwd:
+        The working directory of the process
+    :type cwd: str
+    :param on_output:
+        A callable that is called with every line of stdout and stderr
+    :type on_output: callable
+    :return:
+        The completed process with the combined stdout and stderr as :code:`stdout`
+    :rtype: subprocess.CompletedProcess
+    """
+    async with _job_semaphore():
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=cwd,
+        )
+
+        # The output is read in chunks, because lines of progress output
+        # can exceed the line length limit of the stream reader.
+        output = []
+        pending = b""
+        while True:
+            chunk = await process.stdout.read(_READ_SIZE)
+            if not chunk:
+                break
+
+            output.append(chunk)
+            if on_output is not None:
+                lines, pending = _split_lines(pending + chunk)
+                for line in lines:
+                    on_output(line.decode(errors="replace"))
+
+        if on_output is not None and pending:
+            on_output(pending.decode(errors="replace"))
+
+        returncode = await process.wait()
+
+    return subprocess.CompletedProcess(args, returncode, stdout=b"".join(output))
+
+
+def submit_process(args, cwd=None, on_output=None):
+    """Start an external process without waiting for it to finish
+
+    :param args:
+        The command line of the process
+    :type args: list
+    :param cwd:
+        The working directory of the process
+    :type cwd: str
+    :param on_output:
+        A callable that is called with every line of output. Defaults to the
+        handler set with :func:`~adaptivefiltering.jobs.job_output`.
+    :type on_output: callable
+    :return:
+        A future for the completed process, see :func:`~adaptivefiltering.jobs.run_process`
+    :rtype: concurrent.futures.Future
+    """
+    if on_output is None:
+        on_output = getattr(_output, "handler", None)
+
+    return asyncio.run_coroutine_threadsafe(
+        run_process(args, cwd=cwd, on_output=on_output), _event_loop()
+    )
+
+
+def execute_process(args, cwd=None):
+    """Run an external process and wait for it to finish
+
+    This is a drop-in replacement for :code:`subprocess.run` with combined
+    stdout and stderr that respects the job limit and forwards the output
+    to the handler set with :func:`~adaptivefiltering.jobs.job_output`.
+
+    :param args:
+        The command line of the process
+    :type args: list
+    :param cwd:
+        The working directory of the process
+    :type cwd: str
+    :rtype: subprocess.CompletedProcess
+    """
+    return submit_process(args, cwd=cwd).result()
+
+
+def submit_filter(filter_, dataset, on_output=None):
+    """Apply a filter to a data set in the background
+
+    Several filter executions, e.g. on different tiles or with different
+    parameters, can be submitted at once and run concurrently up to the
+    limit set with :func:`~adaptivefiltering.jobs.set_max_concurrent_jobs`.
+
+    :param filter_:
+        The filter to apply
+    :type filter_: adaptivefiltering.filter.Filter
+    :param dataset:
+        The data set to apply the filter to
+    :type dataset: adaptivefiltering.DataSet
+    :param on_output:
+        A callable that is called with every line of output of external processes
+        started by the filter, e.g. a :class:`~adaptivefiltering.jobs.JobProgress`.
+    :type on_output: callable
+    :return:
+        A future for the filtered data set
+    :rtype: concurrent.futures.Future
+    """
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_max_concurrent_jobs
+        )
+
+    def _execute():
+        with job_output(on_output):
+            return filter_.execute(dataset)
+
+    return _executor.submit(_execute)
+
+
+class JobProgress:
+    def __init__(self, description="", lines=20):
+        """A widget that shows the most recent output of a backend job
+
+        Instances are callable and can be passed as the :code:`on_output`
+        argument of :func:`~adaptivefiltering.jobs.submit_filter`.
+
+        :param description:
+            The label of the widget
+        :type description: str
+        :param lines:
+            The number of output lines to show
+        :type lines: int
+        """
+        self._lines = collections.deque(maxlen=lines)
+        self.widget = ipywidgets.Textarea(
+            description=description,
+            disabled=True,
+            layout=ipywidgets.Layout(width="100%"),
+        )
+
+    def __call__(self, line):
+        self._lines.append(line)
+        self.widget.value = "".join(self._lines)
+
+    def track(self, future):
+        """Indicate the completion of a job in the widget
+
+        :param future:
+            The future of the job
+        :type future: concurrent.futures.Future
+        """
+
+        def _done(future):
+            if future.exception() is not None:
+                self(f"Failed: {future.exception()}\n")
+            else:
+                self("Done\n")
+
+        future.add_done_callback(_done)
+        return future
@@ -0,0 +1,143 @@
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import collections
+import struct
+
+
+# The layout of the public header block that is common to LAS 1.0-1.4
+_header_format = struct.Struct("<4sHH16sBB32s32sHHHLLBHL5L3d3d6d")
+
+# The additional fields of LAS 1.4: Waveform offset, EVLR offset, EVLR count,
+# point count and point count by return
+_header_14_format = struct.Struct("<QQLQ15Q")
+
+# The headers of variable length records and extended variable length records
+_vlr_format = struct.Struct("<H16sHH32s")
+_evlr_format = struct.Struct("<H16sHQ32s")
+
+# The GeoTIFF keys that hold EPSG codes
+_projected_cs_key = 3072
+_geographic_cs_key = 2048
+
+
+LASHeader = collections.namedtuple(
+    "LASHeader",
+    [
+        "version",
+        "point_format",
+        "point_record_length",
+        "compressed",
+        "count",
+        "count_by_return",
+        "scale",
+        "offset",
+        "bounds",
+        "spatial_reference",
+    ],
+)
+LASHeader.__doc__ = """The header information of a LAS/LAZ file
+
+The :code:`bounds` are given as :code:`(minx, maxx, miny, maxy, minz, maxz)`.
+The :code:`spatial_reference` is a WKT string or EPSG code or :code:`None`
+if the file does not specify a reference system.
+"""
+
+
+def _decode(s):
+    return s.split(b"\0", 1)[0].decode(errors="replace")
+
+
+def _spatial_reference(records):
+    """Extract the spatial reference system from the projection records
+
+    :param records:
+        A dictionary mapping record IDs of the :code:`LASF_Projection` user
+        to the record data
+    """
+    # OGC WKT takes precedence over GeoTIFF keys
+    if 2112 in records:
+        return _decode(records[2112]).strip() or None
+
+    if 34735 in records:
+        data = records[34735]
+        nkeys = struct.unpack_from("<H", data, 6)[0]
+        for i in range(nkeys):
+            key, location, _, value = struct.unpack_from("<4H", data, 8 + 8 * i)
+            if location == 0 and key in (_projected_cs_key, _geographic_cs_key):
+                # The value 32767 means user defined, which we cannot resolve
+                if value not in (0, 32767):
+                    return f"EPSG:{value}"
+
+    return None
+
+
+def read_las_header(filename):
+    """Read the header information of a LAS/LAZ file without reading any points
+
+    Besides the public header block, only the variable length records are
+    read to determine the spatial reference system. The cost of this is
+    independent of the number of points in the file.
+
+    :param filename:
+        The LAS/LAZ file to inspect
+    :type filename: str
+    :rtype: adaptivefiltering.lasheader.LASHeader
+    """
+    with open(filename, "rb") as f:
+        data = f.read(_header_format.size + _header_14_format.size)
+        if len(data) < _header_format.size or data[:4] != b"LASF":
+            raise AdaptiveFilteringError(f"{filename} is not a LAS/LAZ file")
+
+        fields = _header_format.unpack_from(data)
+        version = (fields[4], fields[5])
+        header_size, _, nvlrs = fields[10:13]
+        point_format, point_record_length = fields[13:15]
+        count = fields[15]
+        count_by_return = tuple(fields[16:21])
+        scale, offset = fields[21:24], fields[24:27]
+        maxx, minx, maxy, miny, maxz, minz = fields[27:33]
+
+        evlr_offset, nevlrs = 0, 0
+        if version >= (1, 4) and header_size >= len(data):
+            fields14 = _header_14_format.unpack_from(data, _header_format.size)
+            evlr_offset, nevlrs, count = fields14[1:4]
+            count_by_return = tuple(fields14[4:])
+
+        # Collect the projection records from the VLRs and EVLRs
+        records = {}
+        f.seek(header_size)
+        for _ in range(nvlrs):
+            vlr = f.read(_vlr_format.size)
+            if len(vlr) < _vlr_format.size:
+                break
+            _, user, record, length, _ = _vlr_format.unpack(vlr)
+            if _decode(user) == "LASF_Projection":
+                records[record] = f.read(length)
+            else:
+                f.seek(length, 1)
+
+        if evlr_offset:
+            f.seek(evlr_offset)
+            for _ in range(nevlrs):
+                evlr = f.read(_evlr_format.size)
+                if len(evlr) < _evlr_format.size:
+                    break
+                _, user, record, length, _ = _evlr_format.unpack(evlr)
+                if _decode(user) == "LASF_Projection":
+                    records[record] = f.read(length)
+                else:
+                    f.seek(length, 1)
+
+    # LAZ files mark the point format with the two most significant bits
+    return LASHeader(
+        version=f"{version[0]}.{version[1]}",
+        point_format=point_format & 0x3F,
+        point_record_length=point_record_length,
+        compressed=bool(point_format & 0xC0),
+        count=count,
+        count_by_return=count_by_return,
+        scale=tuple(scale),
+        offset=tuple(offset),
+        bounds=(minx, maxx, miny, maxy, minz, maxz),
+        spatial_reference=_spatial_reference(records),
+    )
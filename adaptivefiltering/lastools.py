@@ -1,12 +1,13 @@
 from adaptivefiltering.dataset import DataSet
 from adaptivefiltering.filter import Filter
-from adaptivefiltering.paths import get_temporary_filename, load_schema
+from adaptivefiltering.intermediate import get_intermediate_filename
+from adaptivefiltering.jobs import execute_process
+from adaptivefiltering.paths import claim_temporary_file, load_schema
 from adaptivefiltering.utils import stringify_value
 
 import os
 import platform
 import shutil
-import subprocess
 
 
 # The module wide storage for the lasground prefix
@@ -75,24 +76,34 @@ class LASToolsFilter(Filter, identifier="lastools", backend=True):
                 args.append(strv)
 
         # Create a filename for lasground output
-        outfile = get_temporary_filename(extension="las")
+        outfile = get_intermediate_filename()
 
         # Add input and output to the command line
         args.extend(["-i", dataset.filename, "-o", outfile])
 
         # Call the executable
-        subprocess.run(executable + args)
+        execute_process(executable + args)
 
-        return DataSet(
+        result = DataSet(
             filename=outfile,
             provenance=dataset._provenance + [f"Applied LASGround filter"],
             spatial_reference=dataset.spatial_reference,
         )
+        claim_temporary_file(outfile, result)
+        return result
 
     @classmethod
     def enabled(cls):
         return lastools_is_present()
 
+    @classmethod
+    def backend_version(cls):
+        # LASTools does not report its version, so the installation is identified instead
+        if not lastools_is_present():
+            return ""
+        bindir = os.path.join(get_lastools_directory(), "bin")
+        return f"{bindir}:{os.stat(bindir).st_mtime_ns}"
+
     @classmethod
     def schema(cls):
         return load_schema("lastools.json")
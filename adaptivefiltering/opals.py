@@ -1,6 +1,9 @@
+from adaptivefiltering.cache import DiskCache, hash_versions
 from adaptivefiltering.dataset import DataSet
-from adaptivefiltering.filter import Filter
+from adaptivefiltering.filter import Filter, PipelineMixin, deserialize_filter
+from adaptivefiltering.jobs import execute_process
 from adaptivefiltering.paths import (
+    claim_temporary_file,
     get_temporary_filename,
     get_temporary_workspace,
     load_schema,
@@ -9,7 +12,6 @@ from adaptivefiltering.utils import AdaptiveFilteringError, stringify_value
 
 import click
 import json
-import jsonschema
 import os
 import platform
 import pyrsistent
@@ -21,6 +23,12 @@ import xmltodict
 
 _opals_directory = None
 
+# The cache instance for imported ODM files
+_odm_cache = DiskCache("odm")
+
+# The OPALS modules that write their results to separate raster files
+_raster_modules = frozenset(["Cell", "Grid"])
+
 
 def set_opals_directory(dir):
     """Set custom OPALS installation directory
@@ -205,11 +213,8 @@ def execute_opals_module(dataset=None, config=None):
             args.append(strv)
 
     # Execute the module
-    result = subprocess.run(
-        [executable] + fileargs + args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        cwd=get_temporary_workspace(),
+    result = execute_process(
+        [executable] + fileargs + args, cwd=get_temporary_workspace()
     )
 
     # If the OPALS run was not successful, we raise an error
@@ -217,6 +222,86 @@ def execute_opals_module(dataset=None, config=None):
         raise AdaptiveFilteringError(f"OPALS error: {result.stdout.decode()}")
 
 
+def _raster_output_files(config):
+    """Create temporary filenames for the raster files written by an OPALS module
+
+    :param config:
+        The configuration of a module from :code:`_raster_modules`
+    :type config: dict
+    :return:
+        One filename per raster file that the module writes
+    :rtype: list
+    """
+    features = config.get("feature", ["mean"] if config["type"] == "Cell" else [])
+    if isinstance(features, str):
+        features = [features]
+
+    # Features are written to one file each, unless they are stored as bands
+    count = len(features)
+    if config.get("multiBand", False):
+        count = min(count, 1)
+
+    # Grid writes the interpolated surface in addition to its features
+    if config["type"] == "Grid":
+        count = count + 1
+
+    return [get_temporary_filename(extension="tif") for _ in range(count)]
+
+
+def execute_opals_modules(dataset, filters):
+    """Apply a sequence of OPALS modules to a data set
+
+    All modules operate on the same ODM file, so the data set is imported once
+    and not exported between the stages. OPALS opens the ODM file for writing,
+    even for modules that only derive rasters from the points, so the input ODM
+    file, which may be shared through the cache, is copied once beforehand.
+    Raster files written by modules are placed in the temporary workspace and
+    are owned by the resulting data set.
+
+    :param dataset:
+        The data set to apply the modules to
+    :type dataset: adaptivefiltering.DataSet
+    :param filters:
+        The OPALS filters to apply in order
+    :type filters: list
+    :rtype: adaptivefiltering.opals.OPALSDataManagerObject
+    """
+    # Make sure that the dataset is available in the OPALS format
+    dataset = OPALSDataManagerObject.convert(dataset)
+
+    filename = get_temporary_filename(extension="odm")
+    shutil.copy(dataset.filename, filename)
+
+    result = OPALSDataManagerObject(
+        filename=filename,
+        spatial_reference=dataset.spatial_reference,
+        provenance=dataset._provenance
+        + [
+            f"Applying OPALS module with the following configuration: {f._serialize()}"
+            for f in filters
+        ],
+    )
+    result._source_header = dataset._source_header
+    claim_temporary_file(filename, result)
+
+    # Actually run the CLI
+    for f in filters:
+        config = f.config
+        outputs = []
+        if config["type"] in _raster_modules and "outFile" not in config:
+            outputs = _raster_output_files(config)
+            config = {**pyrsistent.thaw(config), "outFile": outputs}
+
+        try:
+            execute_opals_module(dataset=result, config=config)
+        finally:
+            for output in outputs:
+                if os.path.exists(output):
+                    claim_temporary_file(output, result)
+
+    return result
+
+
 class OPALSFilter(Filter, identifier="opals", backend=True):
     """A filter implementation based on OPALS"""
 
@@ -225,32 +310,10 @@ class OPALSFilter(Filter, identifier="opals", backend=True):
 
         This interfaces with OPALS using its CLI.
         """
+        return execute_opals_modules(dataset, [self])
 
-        # Make sure that the dataset is available in the OPALS format
-        dataset = OPALSDataManagerObject.convert(dataset)
-
-        # Sneak the outFile parameter into the configuration for those filters
-        # that require it. For all others, make a copy of the data to prevent
-        # any harm from OPALS implicit in-place operation.
-        final_filter = self
-        outFile = get_temporary_filename(extension="odm")
-        try:
-            final_filter = self.copy(outFile=outFile)
-        except jsonschema.ValidationError:
-            shutil.copy(dataset.filename, outFile)
-            dataset = OPALSDataManagerObject(filename=outFile)
-
-        # Actually run the CLI
-        execute_opals_module(dataset=dataset, config=final_filter.config)
-
-        return OPALSDataManagerObject(
-            filename=outFile,
-            spatial_reference=dataset.spatial_reference,
-            provenance=dataset._provenance
-            + [
-                f"Applying OPALS module with the following configuration: {self._serialize()}"
-            ],
-        )
+    def as_pipeline(self):
+        return OPALSPipeline(filters=[self])
 
     @classmethod
     def schema(cls):
@@ -272,10 +335,43 @@ class OPALSFilter(Filter, identifier="opals", backend=True):
     def enabled(cls):
         return opals_is_present()
 
+    @classmethod
+    def backend_version(cls):
+        # OPALS does not report its version, so the installation is identified instead
+        if not opals_is_present():
+            return ""
+        executable = get_opals_module_executable("Import")
+        return f"{executable}:{os.stat(executable).st_mtime_ns}"
+
+
+class OPALSPipeline(
+    PipelineMixin, OPALSFilter, identifier="opals_pipeline", backend=False
+):
+    def execute(self, dataset):
+        filters = [
+            deserialize_filter(pyrsistent.thaw(f)) for f in self.config["filters"]
+        ]
+        return execute_opals_modules(dataset, filters)
+
 
 class OPALSDataManagerObject(DataSet):
+    # OPALS does not implement LAZ exporting
+    _laz_export = False
+
+    # The header of the data set that the ODM file was imported from
+    _source_header = None
+
     @classmethod
     def convert(cls, dataset):
+        """Convert a data set to an OPALS Data Manager (ODM) object
+
+        Imported ODM files are stored in a persistent cache, keyed by the
+        content hash of the input data set (which includes its spatial
+        reference) and the installed backend versions. Repeated conversions of the same input, e.g. when tuning
+        the parameters of an OPALS filter, run :code:`opalsImport` only once.
+        Cached ODM files are never modified: OPALS modules that operate in
+        place work on a copy, see :class:`~adaptivefiltering.opals.OPALSFilter`.
+        """
         # Idempotency of the conversion
         if isinstance(dataset, OPALSDataManagerObject):
             return dataset
@@ -286,35 +382,58 @@ class OPALSDataManagerObject(DataSet):
                 "OPALS requires manual setting of the spatial_reference parameter of the DataSet."
             )
 
-        # If dataset is of unknown type, we should first dump it to disk
-        dataset = dataset.save(get_temporary_filename("las"))
+        # Look up a previous import of this data set
+        key = f"{dataset.content_hash()}-{hash_versions()}"
+        dm_filename = _odm_cache.lookup(key, "odm")
+        if dm_filename is None:
+            # If dataset is of unknown type, we should first dump it to disk.
+            # File-backed data sets are imported from their original location.
+            dataset = DataSet.convert(dataset)
+
+            # Construct the new ODM filename
+            dm_filename = get_temporary_filename(extension="odm")
+
+            # Run the opalsImport utility
+            result = execute_process(
+                [
+                    get_opals_module_executable("Import"),
+                    "-inFile",
+                    dataset.filename,
+                    "-outFile",
+                    dm_filename,
+                ]
+            )
 
-        # Construct the new ODM filename
-        dm_filename = get_temporary_filename(extension="odm")
+            # If the OPALS run was not successful, we raise an error
+            if result.returncode != 0:
+                raise AdaptiveFilteringError(f"OPALS error: {result.stdout.decode()}")
 
-        # Run the opalsImport utility
-        result = subprocess.run(
-            [
-                get_opals_module_executable("Import"),
-                "-inFile",
-                dataset.filename,
-                "-outFile",
-                dm_filename,
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-        )
-
-        # If the OPALS run was not successful, we raise an error
-        if result.returncode != 0:
-            raise AdaptiveFilteringError(f"OPALS error: {result.stdout.decode()}")
+            # Store the result in the cache, unless caching is disabled
+            dm_filename = _odm_cache.insert_file(key, "odm", dm_filename) or dm_filename
 
         # Wrap the result in a new data set object
-        return OPALSDataManagerObject(
+        result = OPALSDataManagerObject(
             filename=dm_filename,
             provenance=dataset._provenance + [f"Converted file to ODM format"],
             spatial_reference=dataset.spatial_reference,
         )
+        result._source_header = dataset.header()
+        claim_temporary_file(dm_filename, result)
+        return result
+
+    def header(self):
+        """Inspect the data set without exporting its points
+
+        The header of the data set that this ODM file was imported from is
+        used. OPALS modules applied in this package do not move or remove
+        points, so it remains valid for their results.
+
+        :rtype: adaptivefiltering.lasheader.LASHeader
+        """
+        if self._source_header is not None:
+            return self._source_header
+
+        return super(OPALSDataManagerObject, self).header()
 
     def save(self, filename, compress=False, overwrite=False):
         # I cannot find LAZ export in the OPALS docs
@@ -328,7 +447,7 @@ class OPALSDataManagerObject(DataSet):
             )
 
         # Run the opalsExport utility
-        result = subprocess.run(
+        result = execute_process(
             [
                 get_opals_module_executable("Export"),
                 "-inFile",
@@ -337,9 +456,7 @@ class OPALSDataManagerObject(DataSet):
                 filename,
                 "-oFormat",
                 "las",
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+            ]
         )
 
         # If the OPALS run was not successful, we raise an error
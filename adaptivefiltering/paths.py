@@ -1,5 +1,9 @@
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import collections
 import contextlib
 import functools
+import gc
 import hashlib
 import json
 import os
@@ -7,7 +11,9 @@ import platform
 import requests
 import tarfile
 import tempfile
+import threading
 import uuid
+import weakref
 import xdg
 
 
@@ -17,6 +23,29 @@ _tmp_dir = None
 # Storage for the data directory that will be used to resolve relative paths
 _data_dir = None
 
+# The maximum size of the temporary workspace in bytes, if any
+_workspace_quota = None
+
+# The number of live objects that own each file in the temporary workspace
+_file_owners = {}
+
+# The files in the temporary workspace that can be recreated on demand,
+# ordered from least to most recently used
+_cache_files = collections.OrderedDict()
+
+# The sizes of the files in the temporary workspace that are owned by live
+# objects or can be recreated on demand, measured when they were first tracked
+_file_sizes = {}
+
+# The total size of these files in bytes, which is checked against the quota
+_workspace_size = 0
+
+# The workspace size at which a garbage collection last failed to meet the quota
+_collected_size = None
+
+# Finalizers of file owners may run on any thread during garbage collection
+_workspace_lock = threading.RLock()
+
 # The current data archive URL
 TEST_DATA_ARCHIVE = "https://github.com/ssciwr/adaptivefiltering-test-data/releases/download/2021-12-14/data.tar.gz"
 TEST_DATA_CHECKSUM = "b1af80c173ad475c14972a32bbf86cdbdb8a2197de48ca1e40c4a9859afcabcb"
@@ -60,15 +89,223 @@ def get_temporary_filename(extension=""):
     """Create a filename for a temporary file
 
     Note, the file is not generated, but only a random filename is generated
-    and it is ensured, that its directory is correctly created.
+    and it is ensured, that its directory is correctly created. Use
+    :func:`~adaptivefiltering.paths.claim_temporary_file` to delete the file
+    together with the object that uses it.
 
     :param extension:
         A file extension that should be appended to the generated filename.
     :type extension: str
+    :raises AdaptiveFilteringError:
+        If the temporary workspace exceeds the quota set with
+        :func:`~adaptivefiltering.set_workspace_quota`.
     """
+    if _workspace_quota is not None and _workspace_size > _workspace_quota:
+        _enforce_workspace_quota(_workspace_quota)
+
     return os.path.join(get_temporary_workspace(), f"{uuid.uuid4()}.{extension}")
 
 
+def set_workspace_quota(size):
+    """Set the maximum size of the temporary workspace
+
+    The quota applies to the files that are owned by live data sets and
+    raster models and to files that can be recreated on demand (e.g. downloaded
+    test data). Their total size is tracked as files are claimed and released.
+    Before a new temporary file is created, files that can be recreated on
+    demand are deleted in least recently used order until the workspace fits
+    the quota. Other files are never evicted. If the files owned by live
+    objects alone exceed the quota, an error is raised. By default, the size
+    of the workspace is not limited.
+
+    :param size:
+        The maximum size in bytes or :code:`None` to remove the limit
+    :type size: int
+    """
+    global _workspace_quota
+    _workspace_quota = size
+
+    if size is not None:
+        _evict_cache_files(size)
+
+
+def _in_workspace(filename):
+    return filename.startswith(os.path.join(get_temporary_workspace(), ""))
+
+
+def _file_size(filename):
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def _remove_file(filename):
+    # The file might have been removed explicitly already
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+def _track_file(filename):
+    global _workspace_size
+    with _workspace_lock:
+        if filename not in _file_sizes and _in_workspace(filename):
+            _file_sizes[filename] = _file_size(filename)
+            _workspace_size += _file_sizes[filename]
+
+
+def _untrack_file(filename):
+    global _workspace_size
+    with _workspace_lock:
+        _workspace_size -= _file_sizes.pop(filename, 0)
+
+
+def _measure_workspace():
+    """Update the sizes of the tracked files, which might have grown since"""
+    global _workspace_size
+    with _workspace_lock:
+        for filename in _file_sizes:
+            _file_sizes[filename] = _file_size(filename)
+        _workspace_size = sum(_file_sizes.values())
+
+
+def _enforce_workspace_quota(quota):
+    global _collected_size
+    if _evict_cache_files(quota) <= quota:
+        return
+
+    # Unreachable data sets may only be freed by the cycle collector. This is
+    # only retried once the workspace has grown since the last attempt.
+    if _workspace_size != _collected_size:
+        gc.collect()
+        _measure_workspace()
+        if _evict_cache_files(quota) <= quota:
+            return
+        _collected_size = _workspace_size
+
+    raise AdaptiveFilteringError(
+        f"The temporary workspace exceeds its quota of {quota} bytes. "
+        "Delete data sets that are no longer needed or increase the quota with set_workspace_quota."
+    )
+
+
+def claim_temporary_file(filename, owner):
+    """Tie the lifetime of a file in the temporary workspace to an object
+
+    The file is deleted as soon as all objects that claimed it have been
+    garbage collected, unless it was registered with
+    :func:`~adaptivefiltering.paths.register_cache_file`. Files outside of
+    the temporary workspace are never deleted, but claiming them protects
+    them from cache eviction, see :func:`~adaptivefiltering.paths.is_claimed`.
+    Only files that were created internally for the owner should be claimed,
+    never files at locations chosen by the user.
+
+    :param filename:
+        The file to claim
+    :type filename: str
+    :param owner:
+        The object that uses the file, e.g. a data set
+    """
+    filename = os.path.abspath(filename)
+    with _workspace_lock:
+        _file_owners[filename] = _file_owners.get(filename, 0) + 1
+        _track_file(filename)
+
+    # The workspace as a whole is removed at interpreter exit
+    finalizer = weakref.finalize(owner, _release_temporary_file, filename)
+    finalizer.atexit = False
+
+
+def _release_temporary_file(filename):
+    with _workspace_lock:
+        _file_owners[filename] -= 1
+        if _file_owners[filename] > 0:
+            return
+
+        del _file_owners[filename]
+        if filename not in _cache_files and _in_workspace(filename):
+            _untrack_file(filename)
+            _remove_file(filename)
+
+
+def is_claimed(filename):
+    """Whether a file is currently used by a live object
+
+    :param filename:
+        The file to check
+    :type filename: str
+    :rtype: bool
+    """
+    with _workspace_lock:
+        return os.path.abspath(filename) in _file_owners
+
+
+def register_cache_file(filename):
+    """Mark a file in the temporary workspace as recreatable on demand
+
+    Such files are not deleted when their owners are garbage collected, but
+    evicted when the workspace exceeds its quota. Registering a file again
+    marks it as recently used.
+
+    :param filename:
+        The file to register
+    :type filename: str
+    """
+    filename = os.path.abspath(filename)
+    with _workspace_lock:
+        _cache_files[filename] = None
+        _cache_files.move_to_end(filename)
+        _track_file(filename)
+
+
+def _evict_cache_files(quota):
+    """Delete unused cache files until the workspace fits the quota
+
+    :return:
+        The size of the workspace after eviction in bytes
+    """
+    with _workspace_lock:
+        for filename in list(_cache_files):
+            if _workspace_size <= quota:
+                break
+            if filename in _file_owners:
+                continue
+
+            _untrack_file(filename)
+            _remove_file(filename)
+            del _cache_files[filename]
+
+        return _workspace_size
+
+
+def workspace_usage():
+    """Report the disk usage of the temporary workspace
+
+    :return:
+        A dictionary with the sizes in bytes of all files in the workspace
+        (:code:`total`), of the files owned by live objects (:code:`owned`),
+        of the files that can be recreated on demand (:code:`cache`) and
+        the quota set with :func:`~adaptivefiltering.set_workspace_quota`
+        (:code:`quota`).
+    :rtype: dict
+    """
+    total = 0
+    for root, _, files in os.walk(get_temporary_workspace()):
+        total += sum(_file_size(os.path.join(root, f)) for f in files)
+
+    with _workspace_lock:
+        owned = sum(
+            _file_size(f)
+            for f in _file_owners
+            if f not in _cache_files and _in_workspace(f)
+        )
+        cache = sum(_file_size(f) for f in _cache_files)
+
+    return {"total": total, "owned": owned, "cache": cache, "quota": _workspace_quota}
+
+
 def download_test_file(filename):
     """Ensure the existence of a dataset file by downloading it"""
     full_file = os.path.join(get_temporary_workspace(), "data", filename)
@@ -85,7 +322,15 @@ def download_test_file(filename):
 
         with tarfile.open(archive_file, "r:gz") as tar:
             tar.extractall(path=os.path.join(get_temporary_workspace(), "data"))
+            members = [m.name for m in tar.getmembers() if m.isfile()]
+
+        # The test data can be downloaded again if it is evicted
+        register_cache_file(archive_file)
+        for member in members:
+            register_cache_file(os.path.join(get_temporary_workspace(), "data", member))
 
+    if os.path.exists(full_file):
+        register_cache_file(full_file)
     return full_file
 
 
@@ -1,20 +1,112 @@
 from adaptivefiltering.asprs import asprs
 from adaptivefiltering.dataset import DataSet
 from adaptivefiltering.filter import Filter, PipelineMixin
-from adaptivefiltering.paths import get_temporary_filename, load_schema, locate_file
+from adaptivefiltering.footprint import compute_footprint
+from adaptivefiltering.lasheader import LASHeader
+from adaptivefiltering.paths import (
+    claim_temporary_file,
+    get_temporary_filename,
+    load_schema,
+    locate_file,
+)
+from adaptivefiltering.rasterization import CellStatistics, GridIndex
 from adaptivefiltering.segmentation import Segment, Segmentation, swap_coordinates
+from adaptivefiltering.spatialindex import SpatialIndex, default_resolution
 from adaptivefiltering.utils import (
     AdaptiveFilteringError,
     convert_Segmentation,
     check_spatial_reference,
-    merge_segmentation_features,
 )
 
-from osgeo import ogr
+import concurrent.futures
+import hashlib
 import json
+import math
+import numpy as np
 import os
 import pdal
 import pyrsistent
+import pytools
+
+
+# The number of points per chunk when reading files in chunks
+DEFAULT_CHUNK_SIZE = 2_000_000
+
+# The size in bytes above which point data is stored in memory-mapped files
+_memory_map_threshold = None
+
+
+def set_memory_map_threshold(size):
+    """Store large point data in memory-mapped files
+
+    Point data larger than the given size is stored in a memory-mapped file in
+    the temporary workspace instead of main memory. The operating system can
+    then page the data to and from disk, which allows to explore data sets that
+    are larger than the available memory.
+
+    :param size:
+        The size in bytes above which point data is memory-mapped. A size of
+        zero maps all point data, :code:`None` disables memory mapping.
+    :type size: int
+    """
+    global _memory_map_threshold
+    _memory_map_threshold = size
+
+
+def _use_memory_map(nbytes):
+    return _memory_map_threshold is not None and nbytes > _memory_map_threshold
+
+
+def memory_map_points(data):
+    """Copy point data into a memory-mapped file in the temporary workspace
+
+    :param data:
+        The point data as a structured numpy array
+    :type data: numpy.ndarray
+    :return:
+        A memory-mapped array with the same content
+    :rtype: numpy.memmap
+    """
+    if isinstance(data, np.memmap) and data.filename is not None:
+        return data
+
+    mapped = np.lib.format.open_memmap(
+        get_temporary_filename(extension="npy"),
+        mode="w+",
+        dtype=data.dtype,
+        shape=data.shape,
+    )
+    mapped[:] = data
+    mapped.flush()
+    claim_temporary_file(mapped.filename, mapped)
+    return mapped
+
+
+def allocate_points(npoints, dtype):
+    """Allocate storage for point data
+
+    If the data exceeds the size set with
+    :func:`~adaptivefiltering.pdal.set_memory_map_threshold`, the storage is
+    a memory-mapped file.
+
+    :param npoints:
+        The number of points
+    :type npoints: int
+    :param dtype:
+        The structured data type of the points
+    :type dtype: numpy.dtype
+    """
+    if _use_memory_map(npoints * dtype.itemsize):
+        mapped = np.lib.format.open_memmap(
+            get_temporary_filename(extension="npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=(npoints,),
+        )
+        claim_temporary_file(mapped.filename, mapped)
+        return mapped
+
+    return np.empty(npoints, dtype=dtype)
 
 
 def execute_pdal_pipeline(dataset=None, config=None):
@@ -44,7 +136,8 @@ def execute_pdal_pipeline(dataset=None, config=None):
     if isinstance(config, dict):
         config = [config]
 
-    # Construct the input array argument for the pipeline
+    # Construct the input array argument for the pipeline. PDAL reads the
+    # points directly from the buffer of this array.
     arrays = []
     if dataset is not None:
         arrays.append(dataset.data)
@@ -53,13 +146,237 @@ def execute_pdal_pipeline(dataset=None, config=None):
     pipeline = pdal.Pipeline(json.dumps(config), arrays=arrays)
     _ = pipeline.execute()
 
-    # We are currently only handling situations with one output array
-    assert len(pipeline.arrays) == 1
-
     # Return the output pipeline
     return pipeline
 
 
+def extract_pdal_array(pipeline):
+    """Extract the point data from an executed PDAL pipeline
+
+    The Python bindings of PDAL assemble a new array on every access to
+    :code:`pipeline.arrays`, so this should be called exactly once per
+    pipeline. Afterwards, the pipeline should be released, because it holds
+    PDAL's own copy of the point data.
+
+    :param pipeline:
+        The executed PDAL pipeline
+    :type pipeline: pdal.Pipeline
+    :return:
+        The point data as a structured numpy array
+    :rtype: numpy.ndarray
+    """
+    arrays = pipeline.arrays
+
+    # We are currently only handling situations with one output array
+    if len(arrays) != 1:
+        raise AdaptiveFilteringError(
+            f"Expected a single output array from PDAL, but got {len(arrays)}"
+        )
+
+    return arrays[0]
+
+
+def read_las_chunked(config, chunk_size, dimensions=None):
+    """Read a LAS/LAZ file in chunks and only keep the given dimensions
+
+    Each chunk is read by a separate PDAL pipeline. Only the selected
+    dimensions are copied into the result, so that the peak memory usage is
+    the size of the projected points plus one chunk of full points.
+
+    :param config:
+        The configuration of the :code:`readers.las` stage
+    :type config: dict
+    :param chunk_size:
+        The number of points to read at once
+    :type chunk_size: int
+    :param dimensions:
+        The names of the dimensions to keep. If :code:`None`, all dimensions are kept.
+    :type dimensions: tuple
+    :return:
+        A tuple of the reader metadata and the point data
+    """
+    # Read the header to determine the number of points
+    header = execute_pdal_pipeline(config=[dict(config, count=0)])
+    metadata = json.loads(header.metadata)["metadata"]["readers.las"]
+    npoints = metadata["count"]
+
+    data = None
+    for start in range(0, max(npoints, 1), chunk_size):
+        chunk = extract_pdal_array(
+            execute_pdal_pipeline(
+                config=[dict(config, start=start, count=chunk_size)],
+            )
+        )
+
+        # Allocate the result once the layout of the point data is known
+        if data is None:
+            names = chunk.dtype.names
+            if dimensions is not None:
+                missing = set(dimensions) - set(names)
+                if missing:
+                    raise AdaptiveFilteringError(
+                        f"Dimensions {', '.join(sorted(missing))} are not available in {config['filename']}"
+                    )
+                names = [name for name in names if name in dimensions]
+            dtype = np.dtype([(name, chunk.dtype[name]) for name in names])
+            data = allocate_points(npoints, dtype)
+
+        for name in data.dtype.names:
+            data[name][start : start + chunk.shape[0]] = chunk[name]
+
+    return metadata, data
+
+
+# The dimension that carries the original point indices through parallel pipelines
+_POINT_INDEX = "AdaptiveFilteringPointIndex"
+
+
+def _execute_pdal_tile(data, config):
+    """Execute a PDAL pipeline on a point array and return the resulting array
+
+    This is the unit of work dispatched to worker processes by
+    :func:`~adaptivefiltering.pdal.execute_pdal_pipeline_parallel`. Pipeline
+    objects cannot be pickled, so only the output array is returned.
+    """
+    pipeline = pdal.Pipeline(json.dumps(config), arrays=[data])
+    _ = pipeline.execute()
+    return extract_pdal_array(pipeline)
+
+
+def execute_pdal_pipeline_parallel(
+    dataset=None, config=None, workers=None, tile_size=None, tile_buffer=20.0
+):
+    """Execute a PDAL pipeline in parallel on spatial tiles of a data set
+
+    The data set is partitioned into square tiles. Each tile is extended by a
+    buffer zone and processed by a separate PDAL pipeline in a pool of worker
+    processes. Afterwards, the buffer points are discarded and the results are
+    merged in the original order of the points. This only gives correct results for pipelines that operate on a
+    local neighborhood of each point that is smaller than the buffer.
+
+    :param dataset:
+        The :class:`~adaptivefiltering.pdal.PDALInMemoryDataSet` instance that
+        this pipeline operates on.
+    :type dataset: :class:`~adaptivefiltering.pdal.PDALInMemoryDataSet`
+    :param config:
+        The configuration of the PDAL pipeline, according to the PDAL documentation.
+    :type config: list
+    :param workers:
+        The number of worker processes. Defaults to the number of processors.
+    :type workers: int
+    :param tile_size:
+        The edge length of the tiles. Defaults to a tiling with approximately
+        one tile per worker process.
+    :type tile_size: float
+    :param tile_buffer:
+        The width of the buffer zone around each tile.
+    :type tile_buffer: float
+    :return:
+        A tuple of the merged point array, the number of processed tiles and
+        the tile size that was used.
+    """
+    from adaptivefiltering.tiling import assign_tiles
+
+    if config is None:
+        raise ValueError("PDAL Pipeline configurations is required")
+    if isinstance(config, dict):
+        config = [config]
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    # An empty data set yields an empty result
+    if dataset._base.shape[0] == 0:
+        return dataset.data, 0, tile_size
+
+    # The tiles are gathered dimension by dimension, so that derived data sets
+    # do not need to assemble their full point array.
+    names = dataset._base.dtype.names
+    x, y = dataset.dimension("X"), dataset.dimension("Y")
+
+    # Determine the tiling of the data set
+    bounds = (x.min(), x.max(), y.min(), y.max())
+    if tile_size is None:
+        per_axis = math.ceil(math.sqrt(workers))
+        tile_size = max(bounds[1] - bounds[0], bounds[3] - bounds[2]) / per_axis
+        # Tiles smaller than the buffer would mostly process buffer points
+        tile_size = max(tile_size, tile_buffer, 1e-6)
+
+    # Sort the points by tile once, so that the points of each tile form a
+    # contiguous range of this permutation
+    shape, ix, iy = assign_tiles(x, y, bounds, tile_size)
+    tiles = ix * shape[1] + iy
+    del ix, iy
+    order = np.argsort(tiles, kind="stable")
+    offsets = np.searchsorted(tiles[order], np.arange(shape[0] * shape[1] + 1))
+
+    # The number of neighboring tiles that the buffer zone reaches into
+    reach = int(math.ceil(tile_buffer / tile_size))
+
+    # The worker processes receive the original point indices as an additional
+    # dimension, so that buffer points can be discarded and the original point
+    # order can be restored, even if the pipeline reorders or removes points.
+    dtype = np.dtype(
+        [(name, dataset._base.dtype[name]) for name in names]
+        + [(_POINT_INDEX, np.uint64)]
+    )
+
+    # Dispatch the buffered tiles to the worker processes
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for i in range(shape[0]):
+            for j in range(shape[1]):
+                if offsets[i * shape[1] + j] == offsets[i * shape[1] + j + 1]:
+                    continue
+
+                # Gather the candidate points from the neighboring tiles
+                neighbors = np.array(
+                    [
+                        ni * shape[1] + nj
+                        for ni in range(max(i - reach, 0), min(i + reach + 1, shape[0]))
+                        for nj in range(max(j - reach, 0), min(j + reach + 1, shape[1]))
+                    ]
+                )
+                starts = offsets[neighbors]
+                counts = offsets[neighbors + 1] - starts
+                positions = np.repeat(starts - np.cumsum(counts) + counts, counts)
+                candidates = order[positions + np.arange(counts.sum())]
+
+                minx = bounds[0] + i * tile_size - tile_buffer
+                maxx = bounds[0] + (i + 1) * tile_size + tile_buffer
+                miny = bounds[2] + j * tile_size - tile_buffer
+                maxy = bounds[2] + (j + 1) * tile_size + tile_buffer
+                cx, cy = x[candidates], y[candidates]
+                candidates = candidates[
+                    (cx >= minx) & (cx <= maxx) & (cy >= miny) & (cy <= maxy)
+                ]
+
+                tile = np.empty(candidates.shape[0], dtype=dtype)
+                for name in names:
+                    tile[name] = dataset.dimension(name)[candidates]
+                tile[_POINT_INDEX] = candidates
+
+                future = executor.submit(_execute_pdal_tile, tile, config)
+                futures[future] = i * shape[1] + j
+
+        # Discard the buffer points, i.e. all points that belong to another tile
+        results = []
+        for future, t in futures.items():
+            result = future.result()
+            index = result[_POINT_INDEX].astype(np.int64)
+            results.append(result[tiles[index] == t])
+
+    # Restore the original order of the points and drop the index dimension
+    merged = np.concatenate(results)
+    merged = merged[np.argsort(merged[_POINT_INDEX], kind="stable")]
+    names = [name for name in merged.dtype.names if name != _POINT_INDEX]
+    output = np.empty(merged.shape[0], dtype=[(n, merged.dtype[n]) for n in names])
+    for name in names:
+        output[name] = merged[name]
+
+    return output, len(futures), tile_size
+
+
 class PDALFilter(Filter, identifier="pdal"):
     """A filter implementation based on PDAL"""
 
@@ -67,8 +384,10 @@ class PDALFilter(Filter, identifier="pdal"):
         dataset = PDALInMemoryDataSet.convert(dataset)
         config = pyrsistent.thaw(self.config)
         config.pop("_backend", None)
-        return PDALInMemoryDataSet(
-            pipeline=execute_pdal_pipeline(dataset=dataset, config=config),
+        data = extract_pdal_array(execute_pdal_pipeline(dataset=dataset, config=config))
+        return PDALInMemoryDataSet.derive(
+            dataset,
+            data,
             provenance=dataset._provenance
             + [f"Applying PDAL filter with the following configuration:\n{config}"],
         )
@@ -77,21 +396,87 @@ class PDALFilter(Filter, identifier="pdal"):
     def schema(cls):
         return load_schema("pdal.json")
 
+    @classmethod
+    def backend_version(cls):
+        # The version of the PDAL library is not available in all versions of the bindings
+        library = getattr(getattr(pdal, "info", None), "version", "")
+        return f"{pdal.__version__}-{library}"
+
     def as_pipeline(self):
         return PDALPipeline(filters=[self])
 
+    def dimensions(self):
+        return _pdal_filter_dimensions.get(self.config["type"])
+
+
+# The point dimensions that the supported PDAL filters read. Filters that are
+# not listed here might read any dimension.
+_ground_filter_dimensions = frozenset(
+    ["X", "Y", "Z", "Classification", "ReturnNumber", "NumberOfReturns"]
+)
+_pdal_filter_dimensions = {
+    "filters.csf": _ground_filter_dimensions,
+    "filters.elm": frozenset(["X", "Y", "Z", "Classification"]),
+    "filters.outlier": frozenset(["X", "Y", "Z", "Classification"]),
+    "filters.pmf": _ground_filter_dimensions,
+    "filters.skewnessbalancing": frozenset(["X", "Y", "Z", "Classification"]),
+    "filters.smrf": _ground_filter_dimensions,
+}
+
 
 class PDALPipeline(
     PipelineMixin, PDALFilter, identifier="pdal_pipeline", backend=False
 ):
-    def execute(self, dataset):
+    def execute(self, dataset, workers=1, tile_size=None, tile_buffer=20.0):
+        """Apply the PDAL pipeline to a given data set
+
+        :param dataset:
+            The data set to apply the pipeline to.
+        :type dataset: adaptivefiltering.DataSet
+        :param workers:
+            The number of worker processes to use. If larger than one, the data set
+            is partitioned into spatial tiles that are processed in parallel by
+            :func:`~adaptivefiltering.pdal.execute_pdal_pipeline_parallel`. If
+            :code:`None`, the number of processors is used.
+        :type workers: int
+        :param tile_size:
+            The edge length of the tiles for parallel execution.
+        :type tile_size: float
+        :param tile_buffer:
+            The width of the overlap buffer around each tile for parallel execution.
+        :type tile_buffer: float
+        """
         dataset = PDALInMemoryDataSet.convert(dataset)
         pipeline_json = pyrsistent.thaw(self.config["filters"])
         for f in pipeline_json:
             f.pop("_backend", None)
 
-        return PDALInMemoryDataSet(
-            pipeline=execute_pdal_pipeline(dataset=dataset, config=pipeline_json),
+        if workers is None:
+            workers = os.cpu_count()
+
+        if workers > 1:
+            data, ntiles, tile_size = execute_pdal_pipeline_parallel(
+                dataset=dataset,
+                config=pipeline_json,
+                workers=workers,
+                tile_size=tile_size,
+                tile_buffer=tile_buffer,
+            )
+            return PDALInMemoryDataSet(
+                data=data,
+                provenance=dataset._provenance
+                + [
+                    f"Applying PDAL pipeline on {ntiles} tiles (tile size {tile_size}, buffer {tile_buffer}) using {workers} worker processes with the following configuration:\n{pipeline_json}"
+                ],
+                spatial_reference=dataset.spatial_reference,
+            )
+
+        data = extract_pdal_array(
+            execute_pdal_pipeline(dataset=dataset, config=pipeline_json)
+        )
+        return PDALInMemoryDataSet.derive(
+            dataset,
+            data,
             provenance=dataset._provenance
             + [
                 f"Applying PDAL pipeline with the following configuration:\n{pipeline_json}"
@@ -100,16 +485,39 @@ class PDALPipeline(
 
 
 class PDALInMemoryDataSet(DataSet):
-    def __init__(self, pipeline=None, provenance=[], spatial_reference=None):
+    def __init__(self, pipeline=None, data=None, provenance=[], spatial_reference=None):
         """An in-memory implementation of a Lidar data set that can used with PDAL
 
         :param pipeline:
-            The numpy representation of the data set. This argument is used by e.g. filters that
-            already have the dataset in memory.
-        :type data: pdal.pipeline
+            An executed PDAL pipeline whose output is used as point data. This
+            argument is used by e.g. filters that already have the dataset in
+            memory. The pipeline itself is not stored.
+        :type pipeline: pdal.Pipeline
+        :param data:
+            The point data as a structured numpy array. This can be given instead of
+            the pipeline argument. The array is used without copying.
+        :type data: numpy.ndarray
         """
-        # Store the given data and provenance array
-        self.pipeline = pipeline
+        # Extract the point data from the pipeline. Holding on to the pipeline
+        # would keep PDAL's copy of the point data alive.
+        if data is None and pipeline is not None:
+            data = extract_pdal_array(pipeline)
+
+        # The point data is stored as a base array and a dictionary of dimensions
+        # that were modified with respect to the base array. Derived data sets
+        # share the base array with the data set they were derived from. The
+        # full array is only assembled once, on first access of the data.
+        self._base = data
+        self._columns = {}
+        self._merged = None
+
+        # Large point data is spilled into a memory-mapped file if configured
+        if data is not None and _use_memory_map(data.nbytes):
+            self._base = memory_map_points(data)
+
+        # Grid indices only depend on the coordinates, so they are shared with
+        # derived data sets that do not modify the coordinates.
+        self._grid_indices = {}
 
         super(PDALInMemoryDataSet, self).__init__(
             provenance=provenance,
@@ -118,10 +526,296 @@ class PDALInMemoryDataSet(DataSet):
 
     @property
     def data(self):
-        return self.pipeline.arrays[0]
+        """The point data as a structured numpy array
+
+        If this data set stores modified dimensions separately from the data
+        set it was derived from, the full array is assembled on first access
+        and kept for the lifetime of the data set. Use
+        :func:`~adaptivefiltering.pdal.PDALInMemoryDataSet.dimension` to access
+        single dimensions without assembling the array.
+        """
+        if not self._columns:
+            return self._base
+
+        if self._merged is None:
+            data = allocate_points(self._base.shape[0], self._base.dtype)
+            for name in self._base.dtype.names:
+                data[name] = self.dimension(name)
+            self._merged = data
+        return self._merged
+
+    def dimension(self, name):
+        """Access a single dimension of the point data without copying
+
+        :param name:
+            The name of the dimension, e.g. :code:`Classification`
+        :type name: str
+        :rtype: numpy.ndarray
+        """
+        if name in self._columns:
+            return self._columns[name]
+        return self._base[name]
+
+    @classmethod
+    def derive(cls, parent, data, provenance=[], spatial_reference=None):
+        """Create a data set from a filter result that shares memory with its input
+
+        If the given point data has the same points in the same order as the
+        parent data set, only the modified dimensions are stored and all other
+        dimensions are shared with the parent. Otherwise, or if most of the data
+        was modified, the given array is used as is without copying.
+
+        :param parent:
+            The data set that the filter was applied to
+        :type parent: adaptivefiltering.pdal.PDALInMemoryDataSet
+        :param data:
+            The point data produced by the filter
+        :type data: numpy.ndarray
+        """
+        if spatial_reference is None:
+            spatial_reference = parent.spatial_reference
+
+        # Determine the modified dimensions
+        changed = None
+        if data.dtype == parent._base.dtype and data.shape == parent._base.shape:
+            changed = [
+                name
+                for name in data.dtype.names
+                if not np.array_equal(data[name], parent.dimension(name))
+            ]
+
+        # If most of the data was changed, sharing would hardly save memory, but
+        # copying the modified dimensions would temporarily double it.
+        if (
+            changed is None
+            or 2 * sum(data.dtype[name].itemsize for name in changed)
+            > data.dtype.itemsize
+        ):
+            return cls(
+                data=data, provenance=provenance, spatial_reference=spatial_reference
+            )
+
+        # Only keep the modified dimensions, so that the full array can be released
+        delta = {name: data[name].copy() for name in changed}
+        return cls.from_delta(
+            parent, delta, provenance=provenance, spatial_reference=spatial_reference
+        )
 
     @classmethod
-    def convert(cls, dataset):
+    def from_delta(cls, parent, delta, provenance=[], spatial_reference=None):
+        """Create a data set from a parent data set and a set of modified dimensions
+
+        :param parent:
+            The data set to derive from
+        :type parent: adaptivefiltering.pdal.PDALInMemoryDataSet
+        :param delta:
+            A dictionary mapping dimension names to the modified values
+        :type delta: dict
+        """
+        if spatial_reference is None:
+            spatial_reference = parent.spatial_reference
+
+        dataset = cls(
+            data=parent._base,
+            provenance=provenance,
+            spatial_reference=spatial_reference,
+        )
+        dataset._columns = {**parent._columns, **delta}
+        if "X" not in delta and "Y" not in delta:
+            dataset._grid_indices = parent._grid_indices
+        return dataset
+
+    def delta(self, parent):
+        """The dimensions that were modified with respect to a parent data set
+
+        :param parent:
+            The data set that this data set was derived from
+        :type parent: adaptivefiltering.pdal.PDALInMemoryDataSet
+        :return:
+            A dictionary mapping dimension names to the modified values or
+            :code:`None` if this data set does not share memory with the parent.
+        """
+        if self._base is not parent._base:
+            return None
+
+        return {
+            name: column
+            for name, column in self._columns.items()
+            if column is not parent._columns.get(name)
+        }
+
+    def grid_index(self, resolution):
+        """The assignment of the points to the cells of a raster grid
+
+        The index is built once per resolution and shared with all data sets
+        derived from this one that have the same coordinates.
+
+        :param resolution:
+            The edge length of the raster cells
+        :type resolution: float
+        :rtype: adaptivefiltering.rasterization.GridIndex
+        """
+        if resolution not in self._grid_indices:
+            self._grid_indices[resolution] = GridIndex(
+                self.dimension("X"), self.dimension("Y"), resolution
+            )
+        return self._grid_indices[resolution]
+
+    @pytools.memoize_method
+    def spatial_index(self):
+        """An index for spatial queries on the points of this data set
+
+        The index is built lazily on first use. It is based on the grid index
+        at a resolution chosen from the point density, so it is shared with
+        all data sets derived from this one that have the same coordinates.
+        Data sets with modified coordinates (e.g. after reprojection) build
+        their own index.
+
+        :rtype: adaptivefiltering.spatialindex.SpatialIndex
+        """
+        header = self.header()
+        resolution = default_resolution(header.bounds[:4], header.count)
+        return SpatialIndex(
+            self.dimension("X"), self.dimension("Y"), self.grid_index(resolution)
+        )
+
+    @pytools.memoize_method
+    def cell_statistics(self, resolution):
+        """The per-cell point statistics used for rasterization
+
+        Rasters for any subset of classification values can be computed from
+        these statistics without another pass over the points.
+
+        :param resolution:
+            The edge length of the raster cells
+        :type resolution: float
+        :rtype: adaptivefiltering.rasterization.CellStatistics
+        """
+        return CellStatistics(
+            self.grid_index(resolution),
+            self.dimension("X"),
+            self.dimension("Y"),
+            self.dimension("Z"),
+            self.dimension("Classification"),
+        )
+
+    @pytools.memoize_method
+    def header(self):
+        bounds = []
+        for name in ("X", "Y", "Z"):
+            column = self.dimension(name)
+            if column.shape[0] == 0:
+                bounds.extend([None, None])
+            else:
+                bounds.extend([float(column.min()), float(column.max())])
+
+        return LASHeader(
+            version=None,
+            point_format=None,
+            point_record_length=self._base.dtype.itemsize,
+            compressed=False,
+            count=self._base.shape[0],
+            count_by_return=None,
+            scale=None,
+            offset=None,
+            bounds=tuple(bounds),
+            spatial_reference=self.spatial_reference,
+        )
+
+    @pytools.memoize_method
+    def footprint(self):
+        header = self.header()
+        return compute_footprint(
+            self.dimension("X"), self.dimension("Y"), header.bounds[:4]
+        )
+
+    def spill(self):
+        """Create a data set that stores its point data in a memory-mapped file
+
+        The file is located in the temporary workspace. Filters and
+        rasterization operate on the memory-mapped data transparently. See also
+        :func:`~adaptivefiltering.pdal.set_memory_map_threshold` to do this
+        automatically for large data sets.
+
+        :rtype: adaptivefiltering.pdal.PDALInMemoryDataSet
+        """
+        dataset = PDALInMemoryDataSet(
+            data=memory_map_points(self._base),
+            provenance=self._provenance,
+            spatial_reference=self.spatial_reference,
+        )
+        dataset._columns = dict(self._columns)
+        dataset._grid_indices = self._grid_indices
+        return dataset
+
+    def project(self, dimensions):
+        """Create a data set that only contains the given point dimensions
+
+        :param dimensions:
+            The names of the dimensions to keep
+        :type dimensions: tuple
+        :rtype: adaptivefiltering.pdal.PDALInMemoryDataSet
+        """
+        missing = set(dimensions) - set(self._base.dtype.names)
+        if missing:
+            raise AdaptiveFilteringError(
+                f"Dimensions {', '.join(sorted(missing))} are not available"
+            )
+
+        names = [name for name in self._base.dtype.names if name in dimensions]
+        data = allocate_points(
+            self._base.shape[0],
+            np.dtype([(name, self._base.dtype[name]) for name in names]),
+        )
+        for name in names:
+            data[name] = self.dimension(name)
+
+        return PDALInMemoryDataSet(
+            data=data,
+            provenance=self._provenance
+            + [f"Restricted the point data to the dimensions {', '.join(names)}"],
+            spatial_reference=self.spatial_reference,
+        )
+
+    def select_points(self, points, provenance=None):
+        """Create a data set that only contains a subset of the points
+
+        The selected points are gathered dimension by dimension, so the point
+        data of this data set is not copied as a whole.
+
+        :param points:
+            The indices of the points to keep or a boolean mask over all points
+        :type points: numpy.ndarray
+        :param provenance:
+            The provenance of the new data set. Defaults to the provenance of this data set.
+        :type provenance: list
+        :rtype: adaptivefiltering.pdal.PDALInMemoryDataSet
+        """
+        points = np.asarray(points)
+        if points.dtype == bool:
+            points = np.nonzero(points)[0]
+
+        data = allocate_points(points.shape[0], self._base.dtype)
+        for name in self._base.dtype.names:
+            data[name] = self.dimension(name)[points]
+
+        return PDALInMemoryDataSet(
+            data=data,
+            provenance=self._provenance if provenance is None else provenance,
+            spatial_reference=self.spatial_reference,
+        )
+
+    @pytools.memoize_method
+    def content_hash(self):
+        # Hash dimension by dimension to avoid assembling the full point array
+        hash_ = hashlib.sha256(str(self._base.dtype.descr).encode())
+        for name in self._base.dtype.names:
+            hash_.update(np.ascontiguousarray(self.dimension(name)).view(np.uint8))
+        hash_.update(str(self.spatial_reference).encode())
+        return hash_.hexdigest()
+
+    @classmethod
+    def convert(cls, dataset, dimensions=None, chunk_size=None):
         """Covert a dataset to a PDALInMemoryDataSet instance.
 
         This might involve file system based operations.
@@ -130,6 +824,18 @@ class PDALInMemoryDataSet(DataSet):
 
         :param dataset:
             The data set instance to convert.
+        :param dimensions:
+            The names of the point dimensions to load. If omitted, all dimensions
+            are loaded. If given, the file is read in chunks and only the given
+            dimensions are kept in memory. Data sets that are already in
+            memory are returned unchanged, use
+            :func:`~adaptivefiltering.pdal.PDALInMemoryDataSet.project` for those.
+        :type dimensions: tuple
+        :param chunk_size:
+            The number of points to read at once. By default, files are read in
+            one go if all dimensions are loaded and in chunks of
+            :code:`DEFAULT_CHUNK_SIZE` points otherwise.
+        :type chunk_size: int
         """
         # Conversion should be itempotent
         if isinstance(dataset, PDALInMemoryDataSet):
@@ -137,8 +843,9 @@ class PDALInMemoryDataSet(DataSet):
 
         # save spatial reference of dataset before it is lost
         spatial_reference = dataset.spatial_reference
-        # If dataset is of unknown type, we should first dump it to disk
-        dataset = dataset.save(get_temporary_filename("las"))
+        # If dataset is of unknown type, we should first dump it to disk.
+        # File-backed data sets are read from their original location.
+        dataset = DataSet.convert(dataset)
 
         # Load the file from the given filename
         assert dataset.filename is not None
@@ -151,18 +858,24 @@ class PDALInMemoryDataSet(DataSet):
             config["override_srs"] = spatial_reference
             config["nosrs"] = True
 
-        pipeline = execute_pdal_pipeline(config=[config])
+        if dimensions is not None and chunk_size is None:
+            chunk_size = DEFAULT_CHUNK_SIZE
+
+        if chunk_size is None:
+            pipeline = execute_pdal_pipeline(config=[config])
+            metadata = json.loads(pipeline.metadata)["metadata"]["readers.las"]
+            data = extract_pdal_array(pipeline)
+        else:
+            metadata, data = read_las_chunked(config, chunk_size, dimensions)
 
         if spatial_reference is None:
-            spatial_reference = json.loads(pipeline.metadata)["metadata"][
-                "readers.las"
-            ]["comp_spatialreference"]
+            spatial_reference = metadata["comp_spatialreference"]
 
         spatial_reference = check_spatial_reference(spatial_reference)
         return PDALInMemoryDataSet(
-            pipeline=pipeline,
+            data=data,
             provenance=dataset._provenance
-            + [f"Loaded {pipeline.arrays[0].shape[0]} points from {filename}"],
+            + [f"Loaded {data.shape[0]} points from {filename}"],
             spatial_reference=spatial_reference,
         )
 
@@ -192,41 +905,44 @@ class PDALInMemoryDataSet(DataSet):
             spatial_reference=self.spatial_reference,
         )
 
-    def restrict(self, segmentation=None):
-        # If a single Segment is given, we convert it to a segmentation
-
+    def _segmentation_geometries(self, segmentation):
+        """Transform the features of a segmentation into the reference system of this data set"""
         if isinstance(segmentation, Segment):
             segmentation = Segmentation([segmentation.__geo_interface__])
 
-        def apply_restriction(seg):
+        # not yet sure why the swap is necessary
+        segmentation = swap_coordinates(segmentation)
+        # convert the segmentation from EPSG:4326 to the spatial reference of the dataset
+        segmentation = convert_Segmentation(segmentation, self.spatial_reference)
 
-            # not yet sure why the swap is necessary
-            seg = swap_coordinates(seg)
-            # convert the segmentation from EPSG:4326 to the spatial reference of the dataset
-            seg = convert_Segmentation(seg, self.spatial_reference)
+        return [feature["geometry"] for feature in segmentation["features"]]
 
-            # if multiple polygons have been selected they will be merged in one multipolygon
-            # this guarentees, that len(seg[features]) is always 1.
-            seg = merge_segmentation_features(seg)
-            # Construct a WKT Polygon for the clipping
-            # this will be either a single polygon or a multipolygon
-            polygons = ogr.CreateGeometryFromJson(str(seg["features"][0]["geometry"]))
-            polygons_wkt = polygons.ExportToWkt()
+    def _segment_memberships(self, geometries):
+        """Determine which points are contained in which geometries"""
+        # Data sets without points cannot be indexed, but trivially have no members
+        if self._base.shape[0] == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
 
-            from adaptivefiltering.pdal import execute_pdal_pipeline
+        return self.spatial_index().query_memberships(geometries)
 
-            # Apply the cropping filter with all polygons
-            newdata = execute_pdal_pipeline(
-                dataset=self, config={"type": "filters.crop", "polygon": polygons_wkt}
-            )
+    def restrict(self, segmentation=None):
+        # If a single Segment is given, we convert it to a segmentation
 
-            return PDALInMemoryDataSet(
-                pipeline=newdata,
+        if isinstance(segmentation, Segment):
+            segmentation = Segmentation([segmentation.__geo_interface__])
+
+        def apply_restriction(seg):
+            # Select the points inside any of the polygons
+            geometries = self._segmentation_geometries(seg)
+            points = np.unique(self._segment_memberships(geometries)[0])
+
+            return self.select_points(
+                points,
                 provenance=self._provenance
                 + [
-                    f"Cropping data to only include polygons defined by:\n{str(polygons)}"
+                    f"Cropping data to only include polygons defined by:\n{json.dumps(geometries)}"
                 ],
-                spatial_reference=self.spatial_reference,
             )
 
         # Maybe create the segmentation
@@ -239,3 +955,28 @@ class PDALInMemoryDataSet(DataSet):
             return restricted
         else:
             return apply_restriction(segmentation)
+
+    def segment_labels(self, segmentation):
+        geometries = self._segmentation_geometries(segmentation)
+        if self._base.shape[0] == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        return self.spatial_index().query_labels(geometries)
+
+    def restrict_segments(self, segmentation):
+        geometries = self._segmentation_geometries(segmentation)
+
+        # Memberships are sorted by segment, so each segment is a contiguous slice
+        points, segments = self._segment_memberships(geometries)
+        offsets = np.searchsorted(segments, np.arange(len(geometries) + 1))
+
+        return [
+            self.select_points(
+                points[offsets[i] : offsets[i + 1]],
+                provenance=self._provenance
+                + [
+                    f"Cropping data to only include polygons defined by:\n{json.dumps(geometry)}"
+                ],
+            )
+            for i, geometry in enumerate(geometries)
+        ]
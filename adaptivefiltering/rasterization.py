@@ -0,0 +1,362 @@
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+from osgeo import gdal, osr
+
+import numpy as np
+
+
+# The value used for raster cells without any points
+NODATA = -9999.0
+
+# The order of the bands in rasters, which matches the output_type=all
+# option of PDAL's writers.gdal
+BANDS = ("min", "max", "mean", "idw", "count", "stdev")
+
+
+def raster_grid(x, y, resolution):
+    """Determine the raster grid for a set of points
+
+    The grid layout matches PDAL's :code:`writers.gdal`: The grid is aligned
+    with the lower left corner of the bounding box of the points and the first
+    row of the raster is the northernmost one.
+
+    :return:
+        A tuple of the raster shape :code:`(height, width)` and the GDAL
+        geotransform of the raster.
+    """
+    minx, maxx = float(x.min()), float(x.max())
+    miny, maxy = float(y.min()), float(y.max())
+    width = int((maxx - minx) / resolution) + 1
+    height = int((maxy - miny) / resolution) + 1
+    geotransform = (minx, resolution, 0.0, miny + height * resolution, 0.0, -resolution)
+    return (height, width), geotransform
+
+
+def cell_indices(x, y, shape, geotransform):
+    """Compute the flat raster cell index of each point
+
+    :return:
+        An integer array with the index of the cell in the flattened raster
+    """
+    col = np.floor((x - geotransform[0]) / geotransform[1]).astype(np.int64)
+    row = np.floor((y - geotransform[3]) / geotransform[5]).astype(np.int64)
+    np.clip(col, 0, shape[1] - 1, out=col)
+    np.clip(row, 0, shape[0] - 1, out=row)
+    return row * shape[1] + col
+
+
+class GridIndex:
+    def __init__(self, x, y, resolution):
+        """An index that assigns points to the cells of a raster grid
+
+        The index stores the cell of each point, a permutation that sorts the
+        points by cell and the offsets of each cell into that permutation. It
+        is built once per resolution and shared by all rasterizations of a
+        data set at that resolution.
+
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :param resolution:
+            The edge length of the raster cells
+        :type resolution: float
+        """
+        if x.shape[0] == 0:
+            raise AdaptiveFilteringError("Cannot rasterize a data set without points")
+
+        self.resolution = resolution
+        self.shape, self.geotransform = raster_grid(x, y, resolution)
+        self.cells = cell_indices(x, y, self.shape, self.geotransform)
+        self.order = np.argsort(self.cells, kind="stable")
+        counts = np.bincount(self.cells, minlength=self.size)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    @property
+    def size(self):
+        """The total number of cells in the grid"""
+        return self.shape[0] * self.shape[1]
+
+    def points(self, cell):
+        """The indices of the points in a given cell"""
+        return self.order[self.offsets[cell] : self.offsets[cell + 1]]
+
+    def cell_centers(self, cells):
+        """The coordinates of the centers of the given cells"""
+        x = self.geotransform[0] + (cells % self.shape[1] + 0.5) * self.geotransform[1]
+        y = self.geotransform[3] + (cells // self.shape[1] + 0.5) * self.geotransform[5]
+        return x, y
+
+
+class CellStatistics:
+    def __init__(self, index, x, y, z, classification):
+        """Aggregated point statistics per raster cell and classification value
+
+        The statistics are stored sparsely for all pairs of cell and
+        classification value that contain points. Rasters for any subset of
+        classification values can then be computed by a reduction over these
+        pairs without touching the individual points again.
+
+        :param index:
+            The grid index of the points
+        :type index: GridIndex
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :param z:
+            The values to rasterize, typically the elevation
+        :type z: numpy.ndarray
+        :param classification:
+            The classification values of the points
+        :type classification: numpy.ndarray
+        """
+        self.index = index
+        z = z.astype(np.float64)
+
+        # The inverse distance weights with respect to the cell centers
+        centerx, centery = index.cell_centers(index.cells)
+        distance = np.hypot(x - centerx, y - centery)
+        weights = 1.0 / np.maximum(distance, 1e-6 * index.resolution)
+
+        # Sort the points by cell, classification value and z
+        keys = index.cells * 256 + classification.astype(np.int64)
+        order = np.lexsort((z, keys))
+        sorted_keys = keys[order]
+        first = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        last = np.r_[first[1:] - 1, sorted_keys.shape[0] - 1]
+
+        # Aggregate the statistics for each pair of cell and classification value
+        self.cells = sorted_keys[first] // 256
+        self.classification = sorted_keys[first] % 256
+        self.count = np.diff(np.r_[first, sorted_keys.shape[0]])
+        self.min = z[order[first]]
+        self.max = z[order[last]]
+        self.sum = np.add.reduceat(z[order], first)
+        self.squares = np.add.reduceat(z[order] ** 2, first)
+        self.weighted = np.add.reduceat((weights * z)[order], first)
+        self.weights = np.add.reduceat(weights[order], first)
+
+    def rasterize(self, classification):
+        """Compute the rasters for a subset of classification values
+
+        :param classification:
+            The classification values to include
+        :type classification: tuple
+        :return:
+            A dictionary of rasters with keys as in :code:`BANDS`
+        """
+        mask = np.isin(self.classification, classification)
+        cells = self.cells[mask]
+        if cells.shape[0] == 0:
+            raise AdaptiveFilteringError(
+                f"Cannot rasterize, there are no points with classification {classification}"
+            )
+
+        # The pairs are sorted by cell, so each cell is a contiguous range
+        first = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        occupied = cells[first]
+        count = np.add.reduceat(self.count[mask], first)
+        mean = np.add.reduceat(self.sum[mask], first) / count
+        squares = np.add.reduceat(self.squares[mask], first) / count
+
+        # Assemble the rasters
+        rasters = {name: np.full(self.index.size, NODATA) for name in BANDS}
+        rasters["min"][occupied] = np.minimum.reduceat(self.min[mask], first)
+        rasters["max"][occupied] = np.maximum.reduceat(self.max[mask], first)
+        rasters["mean"][occupied] = mean
+        rasters["idw"][occupied] = np.add.reduceat(
+            self.weighted[mask], first
+        ) / np.add.reduceat(self.weights[mask], first)
+        rasters["count"][occupied] = count
+        rasters["stdev"][occupied] = np.sqrt(np.maximum(squares - mean**2, 0.0))
+
+        return {k: v.reshape(self.index.shape) for k, v in rasters.items()}
+
+
+def rasterize_points(x, y, z, resolution):
+    """Rasterize points with vectorized binning
+
+    Each point is assigned to the raster cell that contains it. For each cell,
+    the minimum, maximum, mean, inverse distance weighted mean, count and
+    standard deviation of the z values are computed. This is an in-memory
+    equivalent of PDAL's :code:`writers.gdal` with :code:`output_type=all`,
+    except that only points within a cell contribute to that cell.
+
+    :param x:
+        The x coordinates of the points
+    :type x: numpy.ndarray
+    :param y:
+        The y coordinates of the points
+    :type y: numpy.ndarray
+    :param z:
+        The values to rasterize, typically the elevation
+    :type z: numpy.ndarray
+    :param resolution:
+        The edge length of the raster cells
+    :type resolution: float
+    :return:
+        A tuple of a dictionary of rasters (with keys as in :code:`BANDS`) and
+        the GDAL geotransform of the rasters.
+    """
+    index = GridIndex(x, y, resolution)
+    classification = np.zeros(x.shape[0], dtype=np.uint8)
+    statistics = CellStatistics(index, x, y, z, classification)
+    return statistics.rasterize((0,)), index.geotransform
+
+
+def create_gdal_raster(rasters, geotransform, spatial_reference=None):
+    """Create an in-memory GDAL dataset from a set of rasters
+
+    :param rasters:
+        A dictionary of rasters as returned by :func:`rasterize_points`
+    :type rasters: dict
+    :param geotransform:
+        The GDAL geotransform of the rasters
+    :type geotransform: tuple
+    :param spatial_reference:
+        The spatial reference system in WKT or as EPSG code
+    :type spatial_reference: str
+    :return:
+        A GDAL dataset using the MEM driver with one band per raster
+    """
+    height, width = next(iter(rasters.values())).shape
+    driver = gdal.GetDriverByName("MEM")
+    raster = driver.Create("", width, height, len(rasters), gdal.GDT_Float64)
+    raster.SetGeoTransform(geotransform)
+
+    if spatial_reference is not None:
+        srs = osr.SpatialReference()
+        srs.SetFromUserInput(spatial_reference)
+        raster.SetProjection(srs.ExportToWkt())
+
+    for i, (name, values) in enumerate(rasters.items()):
+        band = raster.GetRasterBand(i + 1)
+        band.SetDescription(name)
+        band.SetNoDataValue(NODATA)
+        band.WriteArray(values)
+
+    return raster
+
+
+def aggregate_rasters(rasters):
+    """Halve the resolution of rasters by aggregating blocks of 2x2 cells
+
+    The rasters are aggregated according to their name: Minima and maxima are
+    combined as such, counts are summed up, standard deviations are combined
+    from the block statistics and all other rasters are averaged, weighted by
+    the point count if available. Cells without data do not contribute.
+
+    :param rasters:
+        A dictionary of rasters, where cells without data are NaN
+    :type rasters: dict
+    :return:
+        A dictionary of the aggregated rasters, where cells without data are
+        set to :code:`NODATA`
+    """
+    # Pad the rasters to an even shape and split them into blocks
+    blocks = {}
+    for name, values in rasters.items():
+        height, width = values.shape
+        values = np.pad(
+            values, ((0, height % 2), (0, width % 2)), constant_values=np.nan
+        )
+        h, w = values.shape
+        blocks[name] = values.reshape(h // 2, 2, w // 2, 2).swapaxes(1, 2)
+        blocks[name] = blocks[name].reshape(h // 2, w // 2, 4)
+    valid = {name: ~np.isnan(b) for name, b in blocks.items()}
+
+    # The weights for averaging: The point count if available, otherwise uniform
+    if "count" in blocks:
+        counts = np.nan_to_num(blocks["count"])
+    else:
+        counts = np.ones(next(iter(blocks.values())).shape)
+
+    def _average(name, values):
+        # Use uniform weights in blocks that only contain interpolated values
+        weights = np.where(valid[name], counts, 0.0)
+        uniform = valid[name] & (weights.sum(axis=-1) == 0)[..., None]
+        weights = np.where(uniform, 1.0, weights)
+        return np.sum(weights * np.nan_to_num(values), axis=-1) / weights.sum(axis=-1)
+
+    aggregated = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, values in blocks.items():
+            if name == "min":
+                aggregated[name] = np.min(np.where(valid[name], values, np.inf), -1)
+            elif name == "max":
+                aggregated[name] = np.max(np.where(valid[name], values, -np.inf), -1)
+            elif name == "count":
+                aggregated[name] = np.nansum(values, axis=-1)
+            elif name == "stdev" and "mean" in blocks:
+                # Combine the variances through the second moments of the cells
+                mean = _average("mean", blocks["mean"])
+                moment = _average(name, values**2 + blocks["mean"] ** 2)
+                aggregated[name] = np.sqrt(np.maximum(moment - mean**2, 0.0))
+            else:
+                aggregated[name] = _average(name, values)
+
+            # Mark the blocks without any data
+            aggregated[name][~valid[name].any(axis=-1)] = NODATA
+
+    return aggregated
+
+
+def aggregate_raster(raster):
+    """Create a GDAL dataset of half the resolution of a given one
+
+    See :func:`~adaptivefiltering.rasterization.aggregate_rasters` for how
+    the bands are aggregated.
+
+    :param raster:
+        The GDAL dataset to aggregate
+    :return:
+        A GDAL dataset using the MEM driver with the same bands
+    """
+    # Read the bands and mark the cells without data
+    rasters = {}
+    for i in range(raster.RasterCount):
+        band = raster.GetRasterBand(i + 1)
+        values = band.ReadAsArray().astype(np.float64)
+        if band.GetNoDataValue() is not None:
+            values[values == band.GetNoDataValue()] = np.nan
+        rasters[band.GetDescription() or f"band{i + 1}"] = values
+
+    x0, dx, _, y0, _, dy = raster.GetGeoTransform()
+    return create_gdal_raster(
+        aggregate_rasters(rasters),
+        (x0, 2 * dx, 0.0, y0, 0.0, 2 * dy),
+        spatial_reference=raster.GetProjection() or None,
+    )
+
+
+def fill_nodata(raster, bands=("min", "max", "mean", "idw"), max_distance=100):
+    """Interpolate cells without points from their neighborhood
+
+    This is used to mimic the gap-free result of a triangulation based
+    rasterization.
+
+    :param raster:
+        The GDAL dataset whose bands should be filled in-place
+    :param bands:
+        The names of the bands to fill
+    :type bands: tuple
+    :param max_distance:
+        The maximum number of cells to search for values
+    :type max_distance: int
+    """
+    for i in range(raster.RasterCount):
+        band = raster.GetRasterBand(i + 1)
+        if band.GetDescription() in bands:
+            gdal.FillNodata(
+                targetBand=band,
+                maskBand=None,
+                maxSearchDist=max_distance,
+                smoothingIterations=0,
+            )
+
+    return raster
@@ -161,8 +161,6 @@ class Map:
         :type in_srs: str
 
         """
-        from adaptivefiltering.pdal import PDALInMemoryDataSet
-
         # handle exeptions
         if dataset and segmentation:
             raise AdaptiveFilteringError(
@@ -199,13 +197,14 @@ class Map:
                     f"The given segmentation is not of type Segmentation, but {type(segmentation)}."
                 )
 
-        # convert to pdal dataset
+        # The data set is not loaded here, the boundary is taken from its footprint
         if dataset:
-
-            dataset = PDALInMemoryDataSet.convert(dataset)
-            # preserve the original srs from dataset
+            # preserve the original srs from dataset, which is read from the header
+            # if it was not specified explicitly.
             if in_srs is None:
                 self.original_srs = dataset.spatial_reference
+                if self.original_srs is None:
+                    self.original_srs = dataset.header().spatial_reference
             else:
                 if in_srs is None:
                     raise AdaptiveFilteringError(
@@ -419,37 +418,12 @@ class Map:
         """
         takes the dataset returns the boundary Segmentation.
         If a segmentation is given, this will convert it into a boundary segmentation.
+        The boundary of a dataset is its footprint, see :func:`~adaptivefiltering.DataSet.footprint`,
+        which is cached with the dataset and does not require a full pass over the points.
 
         """
-        from adaptivefiltering.pdal import execute_pdal_pipeline
-
         if dataset:
-            info_pipeline = execute_pdal_pipeline(
-                dataset=dataset, config=[{"type": "filters.info"}]
-            )
-
-            hexbin_pipeline = execute_pdal_pipeline(
-                dataset=dataset,
-                config=[
-                    {
-                        "type": "filters.hexbin",
-                        "sample_size": json.loads(info_pipeline.metadata)["metadata"][
-                            "filters.info"
-                        ]["num_points"],
-                        "precision": 10,
-                        "threshold": 1,
-                    },
-                ],
-            )
-
-            # get the coordinates from the metadata:
-            # this gives us lat, lon but for geojson we need lon, lat
-
-            hexbin_coord = [
-                json.loads(hexbin_pipeline.metadata)["metadata"]["filters.hexbin"][
-                    "boundary_json"
-                ]["coordinates"][0]
-            ]
+            hexbin_coord = dataset.footprint()["coordinates"]
         elif segmentation:
 
             segmentation = merge_segmentation_features(segmentation)
@@ -0,0 +1,158 @@
+from adaptivefiltering.clipping import PolygonIndex
+
+import math
+import numpy as np
+
+
+# The average number of points per cell that the default resolution aims for
+POINTS_PER_CELL = 32
+
+
+def default_resolution(bounds, count):
+    """Choose a grid resolution for a spatial index
+
+    :param bounds:
+        The bounding box :code:`(minx, maxx, miny, maxy)` of the points
+    :type bounds: tuple
+    :param count:
+        The number of points
+    :type count: int
+    :rtype: float
+    """
+    minx, maxx, miny, maxy = bounds
+    area = max(maxx - minx, 1e-9) * max(maxy - miny, 1e-9)
+    return math.sqrt(area * POINTS_PER_CELL / max(count, 1))
+
+
+class SpatialIndex:
+    def __init__(self, x, y, grid):
+        """Spatial queries on a set of points using a uniform grid
+
+        The points are sorted by grid cell (see
+        :class:`~adaptivefiltering.rasterization.GridIndex`), so all points
+        within a row of cells form a contiguous range of that permutation.
+        Queries first collect the candidate points from the cells that
+        overlap the query region and then test these candidates exactly.
+        All queries return point indices in ascending order.
+
+        :param x:
+            The x coordinates of the points
+        :type x: numpy.ndarray
+        :param y:
+            The y coordinates of the points
+        :type y: numpy.ndarray
+        :param grid:
+            The grid index of the points
+        :type grid: adaptivefiltering.rasterization.GridIndex
+        """
+        self.x = x
+        self.y = y
+        self.grid = grid
+
+    def _cell_range(self, bounds):
+        """The clipped ranges of cell rows and columns overlapping a bounding box"""
+        minx, maxx, miny, maxy = bounds
+        x0, resolution, _, y0, _, _ = self.grid.geotransform
+        height, width = self.grid.shape
+
+        col0 = max(int(math.floor((minx - x0) / resolution)), 0)
+        col1 = min(int(math.floor((maxx - x0) / resolution)), width - 1)
+        row0 = max(int(math.floor((y0 - maxy) / resolution)), 0)
+        row1 = min(int(math.floor((y0 - miny) / resolution)), height - 1)
+        return row0, row1, col0, col1
+
+    def candidates(self, boxes):
+        """The points in all cells that overlap any of the given bounding boxes
+
+        :param boxes:
+            A list of bounding boxes :code:`(minx, maxx, miny, maxy)`
+        :type boxes: list
+        :rtype: numpy.ndarray
+        """
+        height, width = self.grid.shape
+        selected = np.zeros((height, width), dtype=bool)
+        for box in boxes:
+            row0, row1, col0, col1 = self._cell_range(box)
+            if row0 <= row1 and col0 <= col1:
+                selected[row0 : row1 + 1, col0 : col1 + 1] = True
+
+        # Gather the ranges of the selected cells from the sorted permutation
+        cells = np.flatnonzero(selected)
+        starts = self.grid.offsets[cells]
+        counts = self.grid.offsets[cells + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(
+            counts.sum()
+        )
+        return np.sort(self.grid.order[positions])
+
+    def query_bbox(self, bounds):
+        """The points within a bounding box
+
+        :param bounds:
+            The bounding box :code:`(minx, maxx, miny, maxy)`, including its boundary
+        :type bounds: tuple
+        :rtype: numpy.ndarray
+        """
+        minx, maxx, miny, maxy = bounds
+        points = self.candidates([bounds])
+        x, y = self.x[points], self.y[points]
+        return points[(x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)]
+
+    def query_radius(self, x, y, radius):
+        """The points within a given distance of a location
+
+        :param x:
+            The x coordinate of the location
+        :type x: float
+        :param y:
+            The y coordinate of the location
+        :type y: float
+        :param radius:
+            The maximum distance
+        :type radius: float
+        :rtype: numpy.ndarray
+        """
+        points = self.candidates([(x - radius, x + radius, y - radius, y + radius)])
+        distance = np.hypot(self.x[points] - x, self.y[points] - y)
+        return points[distance <= radius]
+
+    def query_memberships(self, geometries):
+        """Determine which points are contained in which geometries
+
+        :param geometries:
+            A list of GeoJSON geometries of type :code:`Polygon` or :code:`MultiPolygon`
+        :type geometries: list
+        :return:
+            A tuple of point indices and geometry indices as described in
+            :func:`~adaptivefiltering.clipping.PolygonIndex.memberships`
+        """
+        index = PolygonIndex(geometries)
+        points = self.candidates(index.geometry_bounds)
+        inside, geometry = index.memberships(self.x[points], self.y[points])
+        return points[inside], geometry
+
+    def query_labels(self, geometries):
+        """Label each point with the first geometry that contains it
+
+        :param geometries:
+            A list of GeoJSON geometries of type :code:`Polygon` or :code:`MultiPolygon`
+        :type geometries: list
+        :return:
+            An integer array as described in :func:`~adaptivefiltering.clipping.PolygonIndex.labels`
+        :rtype: numpy.ndarray
+        """
+        index = PolygonIndex(geometries)
+        points = self.candidates(index.geometry_bounds)
+        labels = np.full(self.x.shape[0], -1, dtype=np.int64)
+        labels[points] = index.labels(self.x[points], self.y[points])
+        return labels
+
+    def query_polygon(self, geometries):
+        """The points contained in any of the given geometries
+
+        :param geometries:
+            A list of GeoJSON geometries of type :code:`Polygon` or :code:`MultiPolygon`
+        :type geometries: list
+        :rtype: numpy.ndarray
+        """
+        return np.unique(self.query_memberships(geometries)[0])
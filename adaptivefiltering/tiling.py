@@ -0,0 +1,280 @@
+from adaptivefiltering.dataset import DataSet
+from adaptivefiltering.intermediate import get_intermediate_filename
+from adaptivefiltering.paths import claim_temporary_file, get_temporary_workspace
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import json
+import math
+import numpy as np
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+
+def get_pdal_executable():
+    """Find the PDAL command line application
+
+    Tiled execution relies on the streaming capabilities of the PDAL command
+    line application, which are not exposed by the Python bindings.
+    """
+    executable = shutil.which("pdal")
+    if executable is None:
+        raise AdaptiveFilteringError(
+            "The PDAL command line application is required for tiled execution"
+        )
+
+    return executable
+
+
+def run_pdal_application(args, pipeline=None):
+    """Run the PDAL command line application
+
+    :param args:
+        The command line arguments passed to the :code:`pdal` executable.
+    :type args: list
+    :param pipeline:
+        An optional PDAL pipeline configuration that is passed through stdin.
+        In that case, the arguments should contain :code:`pipeline --stdin`.
+    :type pipeline: list
+    """
+    stdin = None
+    if pipeline is not None:
+        stdin = json.dumps(pipeline).encode()
+
+    result = subprocess.run(
+        [get_pdal_executable()] + args,
+        input=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=get_temporary_workspace(),
+    )
+
+    # If the PDAL run was not successful, we raise an error
+    if result.returncode != 0:
+        raise AdaptiveFilteringError(f"PDAL error: {result.stdout.decode()}")
+
+
+def las_writer(filename):
+    """The configuration of a PDAL stage that writes a LAS/LAZ file
+
+    The compression is chosen according to the file extension and all
+    header information is forwarded from the input.
+
+    :param filename:
+        The LAS/LAZ file to write
+    :type filename: str
+    """
+    return {
+        "type": "writers.las",
+        "filename": filename,
+        "compression": "laszip" if filename.endswith(".laz") else "none",
+        "forward": "all",
+    }
+
+
+def dataset_bounds(dataset):
+    """Determine the horizontal bounding box of a file-backed data set
+
+    Only the LAS/LAZ header is read, the point data is not loaded.
+
+    :param dataset:
+        The data set to inspect
+    :type dataset: adaptivefiltering.DataSet
+    :return:
+        The bounding box as a tuple :code:`(minx, maxx, miny, maxy)`
+    """
+    return dataset.header().bounds[:4]
+
+
+def split_into_tiles(dataset, tile_size, tile_buffer=0.0):
+    """Split a data set into square tiles with an overlapping buffer
+
+    The splitting is done by the streaming :code:`pdal tile` application,
+    which means that its memory usage does not depend on the size of the
+    input file.
+
+    :param dataset:
+        The data set to split
+    :type dataset: adaptivefiltering.DataSet
+    :param tile_size:
+        The edge length of the tiles in units of the spatial reference system.
+    :type tile_size: float
+    :param tile_buffer:
+        The width of the buffer zone that is added around each tile.
+    :type tile_buffer: float
+    :return:
+        A list of tuples :code:`(core, tile)` where :code:`core` is the bounding
+        box :code:`(minx, maxx, miny, maxy)` of the tile without buffer and
+        :code:`tile` is the data set containing the buffered tile.
+    """
+    if tile_size <= 0:
+        raise AdaptiveFilteringError("The tile size needs to be positive")
+    if tile_buffer < 0:
+        raise AdaptiveFilteringError("The tile buffer cannot be negative")
+
+    # The tiles are aligned with the lower left corner of the data set
+    dataset = DataSet.convert(dataset)
+    minx, _, miny, _ = dataset_bounds(dataset)
+
+    # Run the tiling application into a fresh directory
+    tile_dir = tempfile.mkdtemp(dir=get_temporary_workspace())
+    run_pdal_application(
+        [
+            "tile",
+            "--length",
+            str(tile_size),
+            "--buffer",
+            str(tile_buffer),
+            "--origin_x",
+            str(minx),
+            "--origin_y",
+            str(miny),
+            dataset.filename,
+            os.path.join(tile_dir, "tile_#.las"),
+        ]
+    )
+
+    # PDAL replaces the # in the output filename with the tile indices
+    tiles = []
+    for filename in sorted(os.listdir(tile_dir)):
+        match = re.match(r"tile_(-?\d+)_(-?\d+)\.las$", filename)
+        if match is None:
+            continue
+
+        i, j = (int(g) for g in match.groups())
+        core = (
+            minx + i * tile_size,
+            minx + (i + 1) * tile_size,
+            miny + j * tile_size,
+            miny + (j + 1) * tile_size,
+        )
+        tile = DataSet(
+            filename=os.path.join(tile_dir, filename),
+            provenance=dataset._provenance,
+            spatial_reference=dataset.spatial_reference,
+        )
+        claim_temporary_file(tile.filename, tile)
+        tiles.append((core, tile))
+
+    # Without any points, PDAL does not write tiles
+    if not tiles:
+        shutil.rmtree(tile_dir, ignore_errors=True)
+
+    return tiles
+
+
+def execute_tiled(filter_, dataset, tile_size, tile_buffer=20.0):
+    """Apply a filter out-of-core by processing the data set tile by tile
+
+    The data set is split into square tiles with an overlapping buffer zone.
+    The filter is applied to each buffered tile separately, the buffer points
+    are discarded and the results are stitched together into a single file.
+    Peak memory usage is thereby bounded by the tile size instead of the size
+    of the data set. For filters that only consider a local neighborhood of
+    each point (e.g. :code:`filters.smrf` or :code:`filters.csf`), the result
+    matches a monolithic run if the buffer exceeds the size of that neighborhood.
+
+    :param filter_:
+        The filter to apply
+    :type filter_: adaptivefiltering.filter.Filter
+    :param dataset:
+        The data set to apply the filter to
+    :type dataset: adaptivefiltering.DataSet
+    :param tile_size:
+        The edge length of the tiles in units of the spatial reference system.
+    :type tile_size: float
+    :param tile_buffer:
+        The width of the buffer zone around each tile that is taken into
+        account by the filter, but not included in the result.
+    :type tile_buffer: float
+    :return:
+        A file-backed data set with the filter applied
+    :rtype: adaptivefiltering.DataSet
+    """
+    from adaptivefiltering.pdal import PDALInMemoryDataSet, execute_pdal_pipeline
+
+    tiles = split_into_tiles(dataset, tile_size, tile_buffer=tile_buffer)
+    if not tiles:
+        raise AdaptiveFilteringError("Cannot apply a tiled filter to an empty data set")
+    tile_dir = os.path.dirname(tiles[0][1].filename)
+
+    results = []
+    try:
+        for core, tile in tiles:
+            # Apply the filter to the buffered tile
+            filtered = PDALInMemoryDataSet.convert(filter_.execute(tile))
+
+            # Discard the buffer points and write the result to disk. The half-open
+            # intervals make sure that each point is assigned to exactly one tile.
+            result_filename = get_intermediate_filename()
+            results.append(result_filename)
+            execute_pdal_pipeline(
+                dataset=filtered,
+                config=[
+                    {
+                        "type": "filters.range",
+                        "limits": f"X[{core[0]}:{core[1]}),Y[{core[2]}:{core[3]})",
+                    },
+                    las_writer(result_filename),
+                ],
+            )
+
+            # The buffered tile is not needed anymore
+            os.remove(tile.filename)
+
+        # Stitch the tile results together with a streaming PDAL pipeline
+        filename = get_intermediate_filename()
+        run_pdal_application(
+            ["pipeline", "--stdin"], pipeline=results + [las_writer(filename)]
+        )
+    finally:
+        # Neither the tiles nor the per-tile results are needed after stitching
+        for result_filename in results:
+            if os.path.exists(result_filename):
+                os.remove(result_filename)
+        shutil.rmtree(tile_dir, ignore_errors=True)
+
+    result = DataSet(
+        filename=filename,
+        provenance=dataset._provenance
+        + [
+            f"Applied the following filter on tiles of size {tile_size} with a buffer of {tile_buffer}:\n{filter_._serialize()}"
+        ],
+        spatial_reference=dataset.spatial_reference,
+    )
+    claim_temporary_file(filename, result)
+    return result
+
+
+def assign_tiles(x, y, bounds, tile_size):
+    """Assign points to square tiles
+
+    The tiles are aligned with the lower left corner of the given bounding box.
+    Points on the upper boundary of the bounding box are assigned to the last
+    tile in that direction, so that each point belongs to exactly one tile.
+
+    :param x:
+        The x coordinates of the points
+    :type x: numpy.ndarray
+    :param y:
+        The y coordinates of the points
+    :type y: numpy.ndarray
+    :param bounds:
+        The bounding box :code:`(minx, maxx, miny, maxy)` of the tiling
+    :type bounds: tuple
+    :param tile_size:
+        The edge length of the tiles
+    :type tile_size: float
+    :return:
+        A tuple of the tile grid shape and the arrays of tile indices in x and y direction
+    """
+    minx, maxx, miny, maxy = bounds
+    shape = (
+        max(int(math.ceil((maxx - minx) / tile_size)), 1),
+        max(int(math.ceil((maxy - miny) / tile_size)), 1),
+    )
+    ix = np.clip(np.floor((x - minx) / tile_size).astype(np.int64), 0, shape[0] - 1)
+    iy = np.clip(np.floor((y - miny) / tile_size).astype(np.int64), 0, shape[1] - 1)
+    return shape, ix, iy
@@ -1,21 +1,191 @@
-from adaptivefiltering.paths import get_temporary_filename
+from adaptivefiltering.paths import load_schema
+from adaptivefiltering.utils import AdaptiveFilteringError
 
-from osgeo import gdal
 from PIL import Image
 
+import collections
 import io
 import ipywidgets
+import jsonschema
+import numpy as np
+import threading
+import weakref
 
 
-def gdal_visualization(dataset, **options):
-    # Do the processing with GDAL
+# The default size in pixels that images are rendered at for display
+DISPLAY_SIZE = 1024
+
+# The maximum number of rendered images that are kept in memory
+RENDER_CACHE_SIZE = 128
+
+# The usage statistics of the cache of rendered images
+RenderCacheInfo = collections.namedtuple(
+    "RenderCacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+# Rendered images keyed on the id of the raster and the options, ordered
+# from least to most recently used. The cache does not reference the rasters.
+_render_cache = collections.OrderedDict()
+_render_cache_rasters = set()
+_render_cache_stats = {"hits": 0, "misses": 0}
+
+# Finalizers of rasters may run during garbage collection on any thread
+_render_cache_lock = threading.RLock()
+
+
+def _windows(values):
+    """The 3x3 neighborhood of all interior cells of a raster
+
+    :return:
+        A list of nine arrays, one for each position in the neighborhood in
+        row-major order, with the shape of the raster without its border.
+    """
+    height, width = values.shape
+    return [
+        values[i : height - 2 + i, j : width - 2 + j]
+        for i in range(3)
+        for j in range(3)
+    ]
+
+
+def _gradient(windows, geotransform, alg="Horn"):
+    """The elevation gradient as computed by gdaldem
+
+    The returned derivatives are not yet scaled by the denominator of the
+    finite difference scheme (8 for Horn, 2 for Zevenbergen-Thorne).
+    """
+    w = windows
+    if alg == "Horn":
+        x = (w[0] + 2 * w[3] + w[6]) - (w[2] + 2 * w[5] + w[8])
+        y = (w[6] + 2 * w[7] + w[8]) - (w[0] + 2 * w[1] + w[2])
+    elif alg == "ZevenbergenThorne":
+        x = w[3] - w[5]
+        y = w[7] - w[1]
+    else:
+        raise AdaptiveFilteringError(f"Unknown gradient algorithm '{alg}'")
+
+    return x / geotransform[1], y / geotransform[5]
+
+
+def _apply_stencil(values, nodata, output_nodata, dtype, func):
+    """Apply a 3x3 stencil computation to all interior cells of a raster
+
+    Like gdaldem, cells on the border or with missing data in their
+    neighborhood are set to the output's nodata value.
+    """
+    result = np.full(values.shape, output_nodata, dtype=dtype)
+    if values.shape[0] < 3 or values.shape[1] < 3:
+        return result
+
+    windows = _windows(values)
+    interior = func(windows)
+    if nodata is not None:
+        missing = np.zeros(interior.shape, dtype=bool)
+        for w in windows:
+            missing |= w == nodata
+        interior[missing] = output_nodata
+
+    result[1:-1, 1:-1] = interior
+    return result
+
+
+def hillshade(
+    values,
+    geotransform,
+    nodata=None,
+    alg="Horn",
+    azimuth=315,
+    altitude=30,
+    zFactor=1.0,
+):
+    """Compute a hillshade of an elevation raster
+
+    This is a vectorized implementation of :code:`gdaldem hillshade`.
+
+    :param values:
+        The elevation raster
+    :type values: numpy.ndarray
+    :param geotransform:
+        The GDAL geotransform of the raster
+    :type geotransform: tuple
+    :param nodata:
+        The value of cells without data in the elevation raster
+    :type nodata: float
+    :return:
+        The shading as integers from 1 to 255, where cells without data are 0.
+    :rtype: numpy.ndarray
+    """
+    azimuth = np.radians(azimuth)
+    altitude = np.radians(altitude)
+    z = zFactor / (8.0 if alg == "Horn" else 2.0)
+
+    def _shade(windows):
+        x, y = _gradient(windows, geotransform, alg=alg)
+        cang = (
+            np.sin(altitude)
+            - (y * np.cos(azimuth) - x * np.sin(azimuth)) * np.cos(altitude) * z
+        ) / np.sqrt(1.0 + z * z * (x * x + y * y))
+        # gdaldem rounds to the nearest integer
+        return np.where(cang <= 0.0, 1.0, np.floor(1.5 + 254.0 * cang))
+
+    return _apply_stencil(values, nodata, 0, np.uint8, _shade)
+
+
+def slope(values, geotransform, nodata=None, alg="Horn"):
+    """Compute the slope of an elevation raster in degrees
+
+    This is a vectorized implementation of :code:`gdaldem slope`.
+
+    :param values:
+        The elevation raster
+    :type values: numpy.ndarray
+    :param geotransform:
+        The GDAL geotransform of the raster
+    :type geotransform: tuple
+    :param nodata:
+        The value of cells without data in the elevation raster
+    :type nodata: float
+    :return:
+        The slope in degrees, where cells without data are -9999.
+    :rtype: numpy.ndarray
+    """
+
+    def _slope(windows):
+        x, y = _gradient(windows, geotransform, alg=alg)
+        scale = 8.0 if alg == "Horn" else 2.0
+        return np.degrees(np.arctan(np.sqrt(x * x + y * y) / scale))
+
+    return _apply_stencil(values, nodata, -9999.0, np.float32, _slope)
+
+
+def render_visualization(raster, **options):
+    """Render a visualization of a raster into a PNG image
+
+    The visualization is computed from the first band of the raster
+    entirely in memory.
+
+    :param raster:
+        The GDAL raster to visualize
+    :return:
+        The PNG encoded image
+    :rtype: bytes
+    """
+    band = raster.GetRasterBand(1)
+    values = band.ReadAsArray().astype(np.float64)
+    nodata = band.GetNoDataValue()
+    geotransform = raster.GetGeoTransform()
+
+    # Compute the visualization
     vis_type = options.pop("visualization_type")
-    gdal_img = gdal.DEMProcessing(
-        get_temporary_filename(extension="tif"), dataset.raster, vis_type, **options
-    )
+    if vis_type == "hillshade":
+        result = hillshade(values, geotransform, nodata=nodata, **options)
+    elif vis_type == "slope":
+        result = slope(values, geotransform, nodata=nodata, **options)
+    else:
+        raise AdaptiveFilteringError(f"Unknown visualization type '{vis_type}'")
 
     # Encode it into an in-memory buffer
-    img = Image.fromarray(gdal_img.ReadAsArray())
+    img = Image.fromarray(result)
 
     # Fix color scheme - also works for greyscale stuff
     if img.mode != "RGB":
@@ -25,4 +195,116 @@ def gdal_visualization(dataset, **options):
     membuf = io.BytesIO()
     img.save(membuf, format="png")
 
-    return ipywidgets.Image(value=membuf.getvalue(), format="png")
+    return membuf.getvalue()
+
+
+def normalize_visualization_options(options):
+    """Complete visualization options with the defaults from the schema
+
+    Options that only differ in whether default values are given explicitly
+    are thereby mapped to the same normalized options.
+
+    :param options:
+        The visualization options including :code:`visualization_type`
+    :type options: dict
+    :rtype: dict
+    """
+    normalized = {}
+    for variant in load_schema("visualization.json")["anyOf"]:
+        properties = variant["properties"]
+        if properties["visualization_type"]["const"] == options.get(
+            "visualization_type"
+        ):
+            for key, prop in properties.items():
+                if "default" in prop:
+                    normalized[key] = prop["default"]
+
+    normalized.update(options)
+    return normalized
+
+
+def _forget_raster(raster_id):
+    """Remove all cached images of a raster that has been freed"""
+    with _render_cache_lock:
+        _render_cache_rasters.discard(raster_id)
+        for key in [key for key in _render_cache if key[0] == raster_id]:
+            del _render_cache[key]
+
+
+def cached_render_visualization(raster, **options):
+    """Render a visualization of a raster using a bounded in-memory cache
+
+    The cache is keyed on the identity of the raster and the normalized
+    visualization options. The options are validated against the schema
+    before rendering. The least recently used images are evicted once the
+    cache holds :code:`RENDER_CACHE_SIZE` images. The cache does not keep
+    rasters alive: Their images are removed once they are freed.
+
+    :param raster:
+        The GDAL raster to visualize
+    :return:
+        The PNG encoded image
+    :rtype: bytes
+    """
+    options = normalize_visualization_options(options)
+    key = (id(raster), tuple(sorted(options.items())))
+
+    with _render_cache_lock:
+        if key in _render_cache:
+            _render_cache_stats["hits"] += 1
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+        _render_cache_stats["misses"] += 1
+
+    jsonschema.validate(options, schema=load_schema("visualization.json"))
+    png = render_visualization(raster, **options)
+
+    with _render_cache_lock:
+        if key[0] not in _render_cache_rasters:
+            _render_cache_rasters.add(key[0])
+            weakref.finalize(raster, _forget_raster, key[0]).atexit = False
+
+        _render_cache[key] = png
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+
+    return png
+
+
+def render_cache_info():
+    """Report the usage statistics of the cache of rendered images
+
+    :return:
+        A named tuple with the number of cache hits and misses as well as
+        the maximum and current size of the cache
+    """
+    with _render_cache_lock:
+        return RenderCacheInfo(
+            _render_cache_stats["hits"],
+            _render_cache_stats["misses"],
+            RENDER_CACHE_SIZE,
+            len(_render_cache),
+        )
+
+
+def clear_render_cache():
+    """Remove all rendered images from the cache"""
+    with _render_cache_lock:
+        _render_cache.clear()
+        _render_cache_stats.update(hits=0, misses=0)
+
+
+def gdal_visualization(dataset, **options):
+    return ipywidgets.Image(
+        value=cached_render_visualization(dataset.raster, **options), format="png"
+    )
+
+
+def image_widget(png):
+    """Wrap a PNG encoded image into a centered widget"""
+    vis = ipywidgets.Image(value=png, format="png")
+    vis.layout = ipywidgets.Layout(width="70%")
+    box_layout = ipywidgets.Layout(
+        width="100%", flex_flow="column", align_items="center", display="flex"
+    )
+    return ipywidgets.HBox(children=[vis], layout=box_layout)
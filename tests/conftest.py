@@ -1,3 +1,5 @@
+from adaptivefiltering.cache import set_cache_directory, set_cache_size
+
 import pytest
 
 
@@ -20,3 +22,12 @@ def pytest_collection_modifyitems(config, items):
     for item in items:
         if "slow" in item.keywords:
             item.add_marker(skip_slow)
+
+
+@pytest.fixture(autouse=True)
+def _isolate_cache_directory(tmp_path_factory):
+    # Tests must not read or write the persistent caches of the user
+    set_cache_directory(str(tmp_path_factory.mktemp("cache")))
+    yield
+    set_cache_directory(None)
+    set_cache_size(5 * 1024**3)
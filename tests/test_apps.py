@@ -1,4 +1,8 @@
 from adaptivefiltering.apps import *
+from adaptivefiltering.dataset import remove_classification
+from adaptivefiltering.pdal import PDALInMemoryDataSet, execute_pdal_pipeline
+
+from . import minimal_dataset
 
 import dataclasses
 import ipywidgets
@@ -25,3 +29,22 @@ def test_return_proxy():
     # Ensure that changes to the widgets do not change the proxy anymore
     w.value = "Bar"
     assert proxy.data == "Foo"
+
+
+def test_preview_classification(minimal_dataset):
+    # Without ground points, the given selection is used
+    removed = remove_classification(minimal_dataset)
+    assert preview_classification([removed], [1, 3]) == (1, 3)
+
+    # With ground points, only those are shown
+    ground = PDALInMemoryDataSet.convert(minimal_dataset)
+    ground = PDALInMemoryDataSet(
+        pipeline=execute_pdal_pipeline(
+            dataset=ground,
+            config={"type": "filters.assign", "value": ["Classification = 2"]},
+        )
+    )
+    assert preview_classification([ground], [1, 3]) == (2,)
+
+    # Ground points in any of the data sets apply to all of them
+    assert preview_classification([removed, ground], [1, 3]) == (2,)
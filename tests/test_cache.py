@@ -0,0 +1,149 @@
+from adaptivefiltering.cache import *
+from adaptivefiltering.paths import claim_temporary_file
+from adaptivefiltering.pdal import PDALFilter, PDALInMemoryDataSet
+
+from . import minimal_dataset
+
+import gc
+import numpy as np
+import os
+import pytest
+
+
+@pytest.fixture
+def cache_directory(tmp_path):
+    set_cache_directory(str(tmp_path))
+    yield tmp_path
+    set_cache_directory(None)
+    set_cache_size(5 * 1024**3)
+
+
+def test_disk_cache(cache_directory):
+    cache = DiskCache("test")
+    assert cache.lookup("foo", "bin") is None
+
+    # Insert an entry and find it again
+    filename = cache.insert("foo", "bin", lambda f: f.write(b"x" * 100))
+    assert cache.lookup("foo", "bin") == filename
+    assert cache.usage() == 100
+
+    # Make sure that the first entry is the least recently used one
+    os.utime(filename, (0, 0))
+
+    # Exceeding the size limit evicts the least recently used entry
+    set_cache_size(150)
+    cache.insert("bar", "bin", lambda f: f.write(b"x" * 100))
+    assert cache.lookup("foo", "bin") is None
+    assert cache.lookup("bar", "bin") is not None
+
+    # A size of zero disables the cache
+    set_cache_size(0)
+    assert cache.insert("baz", "bin", lambda f: f.write(b"x")) is None
+    assert cache.lookup("bar", "bin") is None
+
+
+def test_disk_cache_insert_file(cache_directory, tmp_path_factory):
+    cache = DiskCache("test")
+    source = tmp_path_factory.mktemp("source") / "foo.bin"
+    source.write_bytes(b"x" * 100)
+
+    # The file is moved into the cache
+    filename = cache.insert_file("foo", "bin", str(source))
+    assert cache.lookup("foo", "bin") == filename
+    assert not source.exists()
+
+    # A disabled cache leaves the file in place
+    set_cache_size(0)
+    source.write_bytes(b"x")
+    assert cache.insert_file("bar", "bin", str(source)) is None
+    assert source.exists()
+
+
+def test_disk_cache_eviction_keeps_used_entries(cache_directory):
+    cache = DiskCache("test")
+
+    # An entry that exceeds the size limit alone is kept after insertion
+    set_cache_size(50)
+    first = cache.insert("foo", "bin", lambda f: f.write(b"x" * 100))
+    assert cache.lookup("foo", "bin") == first
+
+    # Entries that are in use are not evicted by later insertions
+    class Owner:
+        pass
+
+    owner = Owner()
+    claim_temporary_file(first, owner)
+    os.utime(first, (0, 0))
+    second = cache.insert("bar", "bin", lambda f: f.write(b"x" * 100))
+    assert os.path.exists(first)
+    assert os.path.exists(second)
+
+    # Once released, the entry is evicted, but the file is not deleted with its owner
+    del owner
+    gc.collect()
+    assert os.path.exists(first)
+    cache.insert("baz", "bin", lambda f: f.write(b"x" * 10))
+    assert not os.path.exists(first)
+
+
+def test_hash_filter():
+    f1 = PDALFilter(type="filters.smrf")
+    f2 = PDALFilter(type="filters.smrf", slope=0.2)
+    assert hash_filter(f1) == hash_filter(PDALFilter(type="filters.smrf"))
+    assert hash_filter(f1) != hash_filter(f2)
+
+
+def test_hash_versions(monkeypatch):
+    # Upgrading a backend invalidates cached results
+    before = hash_versions()
+    monkeypatch.setattr(PDALFilter, "backend_version", classmethod(lambda cls: "x"))
+    assert hash_versions() != before
+
+
+def _fail(self, dataset):
+    raise AssertionError("The filter was executed")
+
+
+def test_cached_filter_execution(cache_directory, minimal_dataset, monkeypatch):
+    f = PDALFilter(type="filters.smrf")
+    result = cached_filter_execution(f, minimal_dataset)
+    assert len(os.listdir(os.path.join(cache_directory, "filter"))) == 1
+
+    # The second application is served from the cache
+    monkeypatch.setattr(PDALFilter, "execute", _fail)
+    cached = cached_filter_execution(f, minimal_dataset)
+    assert np.array_equal(result.data, cached.data)
+    assert result._provenance == cached._provenance
+    assert result.spatial_reference == cached.spatial_reference
+
+    # A different filter configuration misses the cache
+    with pytest.raises(AssertionError):
+        cached_filter_execution(
+            PDALFilter(type="filters.smrf", slope=0.2), minimal_dataset
+        )
+
+    # An upgraded backend misses the cache
+    monkeypatch.setattr(PDALFilter, "backend_version", classmethod(lambda cls: "x"))
+    with pytest.raises(AssertionError):
+        cached_filter_execution(f, minimal_dataset)
+
+
+def test_cached_filter_execution_points(cache_directory, minimal_dataset, monkeypatch):
+    # A filter that removes points does not share memory with its input
+    def thin(self, dataset):
+        dataset = PDALInMemoryDataSet.convert(dataset)
+        return dataset.select_points(np.arange(0, dataset.data.shape[0], 2))
+
+    monkeypatch.setattr(PDALFilter, "execute", thin)
+    f = PDALFilter(type="filters.smrf")
+    result = cached_filter_execution(f, minimal_dataset)
+
+    # The full point data is stored
+    (entry,) = os.listdir(os.path.join(cache_directory, "filter"))
+    with np.load(os.path.join(cache_directory, "filter", entry)) as data:
+        assert "points" in data.files
+
+    monkeypatch.setattr(PDALFilter, "execute", _fail)
+    cached = cached_filter_execution(f, minimal_dataset)
+    assert np.array_equal(result.data, cached.data)
+    assert result._provenance == cached._provenance
@@ -0,0 +1,70 @@
+from adaptivefiltering.clipping import *
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import numpy as np
+import pytest
+
+
+square_with_hole = {
+    "type": "Polygon",
+    "coordinates": [
+        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+        [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]],
+    ],
+}
+
+triangles = {
+    "type": "MultiPolygon",
+    "coordinates": [
+        [[[5, 5], [15, 5], [15, 15], [5, 5]]],
+        [[[20, 20], [21, 20], [21, 21], [20, 20]]],
+    ],
+}
+
+
+def test_polygon_index():
+    x = np.array([1.0, 5.0, 11.0, 20.5, 9.0, -1.0])
+    y = np.array([1.0, 5.5, 6.0, 20.2, 8.0, 1.0])
+    index = PolygonIndex([square_with_hole, triangles])
+
+    points, geometries = index.memberships(x, y)
+    assert points.tolist() == [0, 4, 2, 3, 4]
+    assert geometries.tolist() == [0, 0, 1, 1, 1]
+
+    assert index.contains(x, y).tolist() == [True, False, True, True, True, False]
+
+
+def test_polygon_index_labels():
+    x = np.array([1.0, 5.0, 11.0, 20.5, 9.0, -1.0])
+    y = np.array([1.0, 5.5, 6.0, 20.2, 8.0, 1.0])
+
+    # Overlapping points are labelled with the first geometry
+    labels = PolygonIndex([square_with_hole, triangles]).labels(x, y)
+    assert labels.tolist() == [0, -1, 1, 1, 0, -1]
+    labels = PolygonIndex([triangles, square_with_hole]).labels(x, y)
+    assert labels.tolist() == [1, -1, 0, 0, 0, -1]
+
+
+@pytest.mark.parametrize("bands", [None, 1, 7])
+def test_polygon_index_random(bands):
+    rng = np.random.default_rng(42)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, 30))
+    radii = rng.uniform(1, 5, 30)
+    ring = np.stack([radii * np.cos(angles), radii * np.sin(angles)], axis=1)
+    polygon = {"type": "Polygon", "coordinates": [ring.tolist()]}
+
+    # Compare against an unindexed even-odd test
+    x, y = rng.uniform(-6, 6, (2, 10000))
+    expected = np.zeros(x.shape, dtype=bool)
+    for (x0, y0), (x1, y1) in zip(ring, np.roll(ring, -1, axis=0)):
+        expected ^= ((y0 > y) != (y1 > y)) & (x < x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+
+    assert np.array_equal(PolygonIndex([polygon], bands=bands).contains(x, y), expected)
+
+
+def test_polygon_index_invalid():
+    with pytest.raises(AdaptiveFilteringError):
+        PolygonIndex([{"type": "Point", "coordinates": [0, 0]}])
+
+    # An empty index contains no points
+    assert not PolygonIndex([]).contains(np.zeros(3), np.zeros(3)).any()
@@ -5,6 +5,7 @@ from adaptivefiltering.asprs import asprs
 
 from . import dataset, minimal_dataset
 
+import gc
 import io
 import numpy as np
 import os
@@ -22,6 +23,43 @@ def test_show(dataset):
     dataset.show(visualization_type="slope", classification=asprs[5])
 
 
+def test_rasterize_reuses_points(minimal_dataset):
+    # The file is only read once for rasterizations with different options
+    ground = minimal_dataset.rasterize(classification=asprs[2])
+    everything = minimal_dataset.rasterize(resolution=1.0)
+    assert ground.dataset is everything.dataset
+
+
+def test_rasterize_engines(minimal_dataset):
+    # Both rasterization engines produce a raster
+    for engine in ("numpy", "pdal"):
+        model = minimal_dataset.rasterize(engine=engine)
+        assert model.raster.RasterXSize > 0
+        model.show()
+
+    with pytest.raises(AdaptiveFilteringError):
+        minimal_dataset.rasterize(engine="foo")
+
+
+def test_raster_pyramid(dataset):
+    model = dataset.rasterize(resolution=1.0)
+    size = max(model.raster.RasterXSize, model.raster.RasterYSize)
+
+    # Without a display size, the full resolution is used
+    assert model.select_level() == 0
+    assert model.select_level(display_size=size) == 0
+
+    # The coarsest level that fills the display is selected
+    level = model.select_level(display_size=size // 4)
+    assert level == 2
+    raster = model.pyramid_level(level)
+    assert max(raster.RasterXSize, raster.RasterYSize) >= size // 4
+    assert raster.GetGeoTransform()[1] == 4.0
+    assert model.pyramid_level(level) is raster
+
+    model.render(display_size=size // 4)
+
+
 def test_restriction(minimal_dataset):
     # Trigger generation of the UI
     minimal_dataset.restrict()
@@ -52,6 +90,33 @@ def test_restriction(minimal_dataset):
     restricted.show()
 
 
+def test_restrict_segments(minimal_dataset):
+    coordinates1 = [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]]
+    coordinates2 = [[0.2, 0.2], [0.4, 1.0], [1.0, 1.0], [1.0, 0.0], [0.2, 0.2]]
+    segmentation = Segmentation(
+        [
+            {
+                "type": "Feature",
+                "properties": {"style": {}},
+                "geometry": {"type": "Polygon", "coordinates": coordinates},
+            }
+            for coordinates in (coordinates1, coordinates2)
+        ]
+    )
+
+    # The batch restriction agrees with restricting to each segment separately
+    restricted = minimal_dataset.restrict_segments(segmentation)
+    assert len(restricted) == 2
+    for segment, dataset in zip(segmentation["features"], restricted):
+        single = minimal_dataset.restrict(Segmentation([segment]))
+        assert np.array_equal(dataset.data, single.data)
+
+    # Labels are consistent with the restricted data sets
+    labels = minimal_dataset.segment_labels(segmentation)
+    assert np.count_nonzero(labels == 0) == restricted[0].data.shape[0]
+    assert np.count_nonzero(labels >= 0) <= sum(d.data.shape[0] for d in restricted)
+
+
 def test_save_dataset(minimal_dataset):
     # This should do nothing
     minimal_dataset.save(minimal_dataset.filename)
@@ -69,6 +134,45 @@ def test_save_dataset(minimal_dataset):
     minimal_dataset.save(tmpfile, overwrite=True)
 
 
+def test_convert_without_copy(minimal_dataset):
+    # File-backed data sets are used in place
+    assert DataSet.convert(minimal_dataset) is minimal_dataset
+
+    from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+    # The in-memory data set is read from the original file
+    converted = PDALInMemoryDataSet.convert(minimal_dataset)
+    assert minimal_dataset.filename in converted._provenance[-1]
+
+    # Other data sets are written to disk
+    saved = DataSet.convert(converted)
+    assert saved.filename != minimal_dataset.filename
+
+
+def test_temporary_file_cleanup(minimal_dataset):
+    from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+    # Intermediate files are deleted with the data set that owns them
+    saved = DataSet.convert(PDALInMemoryDataSet.convert(minimal_dataset))
+    filename = saved.filename
+    assert os.path.exists(filename)
+    del saved
+    gc.collect()
+    assert not os.path.exists(filename)
+
+    # Input files are never deleted
+    filename = minimal_dataset.filename
+    DataSet(filename=filename)
+    gc.collect()
+    assert os.path.exists(filename)
+
+    # Neither are files written to user-chosen locations
+    filename = get_temporary_filename(extension="las")
+    minimal_dataset.save(filename)
+    gc.collect()
+    assert os.path.exists(filename)
+
+
 def test_remove_classification(minimal_dataset):
     removed = remove_classification(minimal_dataset)
     vals = tuple(np.unique(removed.data["Classification"]))
@@ -103,3 +103,19 @@ def test_pipeline(p):
 
     form = p.widget_form()
     p2 = p.copy(**form.data)
+
+
+def test_pipeline_plan():
+    from adaptivefiltering.pdal import PDALPipeline
+
+    # Consecutive PDAL filters are fused into a single PDAL pipeline
+    outlier = PDALFilter(type="filters.outlier", method="statistical")
+    smrf = PDALFilter(type="filters.smrf")
+    plan = Pipeline(filters=[outlier, smrf, smrf]).plan()
+    assert len(plan) == 1
+    assert isinstance(plan[0], PDALPipeline)
+    assert len(plan[0].config["filters"]) == 3
+
+    # A single filter is not wrapped
+    plan = Pipeline(filters=[smrf]).plan()
+    assert plan == [smrf]
@@ -0,0 +1,57 @@
+from adaptivefiltering.footprint import *
+from adaptivefiltering.pdal import PDALInMemoryDataSet
+
+from . import dataset, minimal_dataset
+
+import numpy as np
+
+
+def test_occupancy_grid():
+    x = np.array([0.0, 9.9, 5.0])
+    y = np.array([0.0, 9.9, 5.0])
+    occupied, geotransform = occupancy_grid(x, y, (0.0, 10.0, 0.0, 10.0), grid_size=10)
+    assert occupied.sum() == 3
+
+    # The first row is the northernmost one
+    assert occupied[-1, 0]
+    assert occupied[0, -1]
+    assert geotransform[5] < 0
+
+
+def test_close_occupancy():
+    occupied = np.ones((5, 5), dtype=bool)
+    occupied[2, 2] = False
+    occupied[0, 0] = False
+    closed = close_occupancy(occupied)
+
+    # Interior holes are filled, occupied cells stay occupied
+    assert closed[2, 2]
+    assert np.all(closed[occupied])
+
+
+def test_compute_footprint():
+    x, y = np.meshgrid(np.linspace(0, 100, 200), np.linspace(0, 50, 100))
+    footprint = compute_footprint(x.ravel(), y.ravel(), (0.0, 100.0, 0.0, 50.0))
+    assert footprint["type"] == "Polygon"
+
+    ring = np.array(footprint["coordinates"][0])
+    assert np.allclose(ring.min(axis=0), [0, 0], atol=1.0)
+    assert np.allclose(ring.max(axis=0), [100, 50], atol=1.0)
+
+
+def test_dataset_footprint(dataset):
+    footprint = dataset.footprint()
+    ring = np.array(footprint["coordinates"][0])
+
+    # The sampled footprint covers the bounding box of the data set
+    minx, maxx, miny, maxy = dataset.header().bounds[:4]
+    tolerance = max(maxx - minx, maxy - miny) / 50
+    assert np.allclose(ring.min(axis=0), [minx, miny], atol=tolerance)
+    assert np.allclose(ring.max(axis=0), [maxx, maxy], atol=tolerance)
+
+    # The in-memory footprint agrees with the sampled one
+    inmemory = np.array(
+        PDALInMemoryDataSet.convert(dataset).footprint()["coordinates"][0]
+    )
+    assert np.allclose(inmemory.min(axis=0), ring.min(axis=0), atol=tolerance)
+    assert np.allclose(inmemory.max(axis=0), ring.max(axis=0), atol=tolerance)
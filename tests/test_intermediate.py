@@ -0,0 +1,43 @@
+from adaptivefiltering.intermediate import *
+from adaptivefiltering.dataset import DataSet
+from adaptivefiltering.pdal import PDALInMemoryDataSet
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+from . import minimal_dataset
+
+import pytest
+
+
+def test_set_intermediate_format():
+    with pytest.raises(AdaptiveFilteringError):
+        set_intermediate_format("npy")
+
+    assert get_intermediate_filename().endswith(".las")
+    set_intermediate_format("laz")
+    try:
+        assert get_intermediate_filename().endswith(".laz")
+        assert get_intermediate_filename(compress=False).endswith(".las")
+    finally:
+        set_intermediate_format("las")
+
+
+def test_convert_intermediate_format(minimal_dataset):
+    inmem = PDALInMemoryDataSet.convert(minimal_dataset)
+
+    set_intermediate_format("laz")
+    try:
+        converted = DataSet.convert(inmem)
+    finally:
+        set_intermediate_format("las")
+
+    assert converted.filename.endswith(".laz")
+    assert PDALInMemoryDataSet.convert(converted).data.shape == inmem.data.shape
+
+
+def test_benchmark_intermediate_formats(minimal_dataset):
+    results = benchmark_intermediate_formats(minimal_dataset)
+    assert set(results.keys()) == {"las", "laz", "npy"}
+    assert results["laz"]["size"] < results["las"]["size"]
+    for result in results.values():
+        assert result["write"] > 0
+        assert result["read"] > 0
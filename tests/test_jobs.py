@@ -0,0 +1,76 @@
+from adaptivefiltering.jobs import *
+from adaptivefiltering.pdal import PDALFilter, PDALInMemoryDataSet
+
+from . import minimal_dataset
+
+import os
+import sys
+
+
+def test_execute_process():
+    result = execute_process([sys.executable, "-c", "print('Hello'); print('World')"])
+    assert result.returncode == 0
+    assert result.stdout.decode().split() == ["Hello", "World"]
+
+    result = execute_process([sys.executable, "-c", "import sys; sys.exit(3)"])
+    assert result.returncode == 3
+
+
+def test_process_output():
+    lines = []
+    with job_output(lines.append):
+        execute_process([sys.executable, "-c", "print('foo'); print('bar')"])
+    assert [line.strip() for line in lines] == ["foo", "bar"]
+
+    progress = JobProgress(lines=1)
+    submit_process(
+        [sys.executable, "-c", "print('a'); print('b')"], on_output=progress
+    ).result()
+    assert progress.widget.value.strip() == "b"
+
+
+def test_progress_output():
+    # Progress output without newlines exceeds the line length limit of asyncio
+    script = "import sys; sys.stdout.write(''.join(f'{i}%\\r' for i in range(100000)))"
+    lines = []
+    with job_output(lines.append):
+        result = execute_process([sys.executable, "-c", script])
+
+    assert result.returncode == 0
+    assert len(lines) == 100000
+    assert lines[-1] == "99999%\r"
+
+
+def _run_intervals(count):
+    """Run processes concurrently and return the time intervals they ran in"""
+    # The timestamps are taken within the processes, so that start-up
+    # latencies of a loaded machine do not matter.
+    script = "import time; s = time.time(); time.sleep(0.5); print(s, time.time())"
+    futures = [submit_process([sys.executable, "-c", script]) for _ in range(count)]
+    return sorted(tuple(map(float, f.result().stdout.split())) for f in futures)
+
+
+def test_concurrent_processes():
+    try:
+        # Two processes overlap if both start before either ends
+        set_max_concurrent_jobs(2)
+        (start1, end1), (start2, end2) = _run_intervals(2)
+        assert start2 < end1
+
+        # With a single slot, the second process starts after the first ended
+        set_max_concurrent_jobs(1)
+        (start1, end1), (start2, end2) = _run_intervals(2)
+        assert start2 >= end1
+    finally:
+        set_max_concurrent_jobs(os.cpu_count() or 1)
+
+
+def test_submit_filter(minimal_dataset):
+    progress = JobProgress()
+    future = progress.track(
+        submit_filter(
+            PDALFilter(type="filters.smrf"), minimal_dataset, on_output=progress
+        )
+    )
+    dataset = PDALInMemoryDataSet.convert(future.result())
+    assert dataset.data.shape[0] > 0
@@ -0,0 +1,37 @@
+from adaptivefiltering.lasheader import *
+from adaptivefiltering.paths import get_temporary_filename
+from adaptivefiltering.pdal import PDALInMemoryDataSet
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+from . import dataset, minimal_dataset
+
+import numpy as np
+import pytest
+
+
+def test_read_las_header(dataset):
+    header = dataset.header()
+    assert header.compressed
+    assert header.spatial_reference is not None
+
+    # The header agrees with the point data
+    data = PDALInMemoryDataSet.convert(dataset).data
+    assert header.count == data.shape[0]
+    assert np.isclose(header.bounds[0], data["X"].min())
+    assert np.isclose(header.bounds[3], data["Y"].max())
+
+
+def test_inmemory_header(minimal_dataset):
+    header = minimal_dataset.header()
+    inmemory = PDALInMemoryDataSet.convert(minimal_dataset).header()
+    assert inmemory.count == header.count
+    assert np.allclose(inmemory.bounds, header.bounds)
+
+
+def test_read_invalid_header():
+    filename = get_temporary_filename(extension="las")
+    with open(filename, "wb") as f:
+        f.write(b"This is not a LAS file")
+
+    with pytest.raises(AdaptiveFilteringError):
+        read_las_header(filename)
@@ -1,9 +1,13 @@
 from adaptivefiltering.opals import *
-from adaptivefiltering.pdal import PDALInMemoryDataSet
+from adaptivefiltering.opals import _odm_cache, _raster_output_files
+from adaptivefiltering.cache import set_cache_directory, set_cache_size
+from adaptivefiltering.filter import Pipeline
+from adaptivefiltering.pdal import PDALFilter, PDALInMemoryDataSet
 from adaptivefiltering.utils import AdaptiveFilteringError
 
 from . import dataset, minimal_dataset, mock_environment
 
+import gc
 import jsonschema
 import os
 import pyrsistent
@@ -108,7 +112,92 @@ def test_opals_datamanager(minimal_dataset):
     odm2 = OPALSDataManagerObject.convert(odm)
     assert old_file == odm2.filename
 
+    # The header is taken from the imported data set
+    assert odm.header() == minimal_dataset.header()
+    assert OPALSFilter(type="RobFilter").execute(odm).header() == odm.header()
+
     # Check conversion into PDAL object and back
     pdal = PDALInMemoryDataSet.convert(odm)
     assert pdal.data.shape[0] > 0
     back = OPALSDataManagerObject.convert(pdal)
+
+
+@pytest.mark.skipif(not opals_is_present(), reason="OPALS not found.")
+def test_opals_import_cache(minimal_dataset):
+    # Repeated conversions of the same data set reuse the imported ODM file
+    odm = OPALSDataManagerObject.convert(minimal_dataset)
+    assert OPALSDataManagerObject.convert(minimal_dataset).filename == odm.filename
+
+    # Applying a filter leaves the cached ODM file intact
+    OPALSFilter(type="RobFilter").execute(minimal_dataset)
+    assert OPALSDataManagerObject.convert(minimal_dataset).filename == odm.filename
+    assert os.path.exists(odm.filename)
+
+
+@pytest.mark.skipif(not opals_is_present(), reason="OPALS not found.")
+def test_opals_import_cache_smaller_than_odm(minimal_dataset, tmp_path):
+    set_cache_directory(str(tmp_path))
+    set_cache_size(1)
+    try:
+        # The ODM file exceeds the cache size, but is not evicted while in use
+        odm = OPALSDataManagerObject.convert(minimal_dataset)
+        assert os.path.exists(odm.filename)
+        OPALSFilter(type="RobFilter").execute(odm)
+        assert os.path.exists(odm.filename)
+
+        # Modules that derive rasters operate on a copy of the cached file
+        result = OPALSFilter(type="Grid").execute(odm)
+        assert result.filename != odm.filename
+
+        # Unused entries are evicted
+        filename = odm.filename
+        del odm
+        gc.collect()
+        _odm_cache.evict()
+        assert not os.path.exists(filename)
+        assert os.path.exists(result.filename)
+
+        # The copy is removed together with its data set
+        filename = result.filename
+        del result
+        gc.collect()
+        assert not os.path.exists(filename)
+    finally:
+        set_cache_directory(None)
+        set_cache_size(5 * 1024**3)
+
+
+@pytest.mark.skipif(not opals_is_present(), reason="OPALS not found.")
+def test_opals_pipeline(minimal_dataset):
+    grid = OPALSFilter(type="Grid")
+    robfilter = OPALSFilter(type="RobFilter")
+    smrf = PDALFilter(type="filters.smrf")
+
+    # Consecutive OPALS modules are fused into a single OPALS pipeline
+    plan = Pipeline(filters=[grid, robfilter, smrf]).plan()
+    assert len(plan) == 2
+    assert isinstance(plan[0], OPALSPipeline)
+    assert len(plan[0].config["filters"]) == 2
+
+    # Modules that derive rasters leave the imported ODM file untouched
+    odm = OPALSDataManagerObject.convert(minimal_dataset)
+    mtime = os.path.getmtime(odm.filename)
+    assert grid.execute(odm).filename != odm.filename
+    assert os.path.getmtime(odm.filename) == mtime
+
+    # Modifying modules work on a single copy for the whole chain
+    result = plan[0].execute(odm)
+    assert result.filename != odm.filename
+    assert PDALInMemoryDataSet.convert(result).data.shape[0] > 0
+
+
+def test_raster_output_files():
+    # Cell writes one raster per feature, unless they are stored as bands
+    assert len(_raster_output_files({"type": "Cell"})) == 1
+    assert len(_raster_output_files({"type": "Cell", "feature": ["min", "max"]})) == 2
+    config = {"type": "Cell", "feature": ["min", "max"], "multiBand": True}
+    assert len(_raster_output_files(config)) == 1
+
+    # Grid writes the surface in addition to its features
+    assert len(_raster_output_files({"type": "Grid"})) == 1
+    assert len(_raster_output_files({"type": "Grid", "feature": ["sigmaz"]})) == 2
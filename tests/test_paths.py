@@ -1,7 +1,11 @@
 from adaptivefiltering.paths import *
+from adaptivefiltering.utils import AdaptiveFilteringError
 
 from . import mock_environment
 
+from collections import OrderedDict
+import adaptivefiltering.paths
+import gc
 import os
 import platform
 import pytest
@@ -58,3 +62,95 @@ def test_within_temporary_workspace():
         assert cwd != os.getcwd()
 
     assert cwd == os.getcwd()
+
+
+@pytest.fixture
+def workspace(monkeypatch):
+    # An isolated workspace, so that shared test data is not evicted
+    tmp_dir = tempfile.TemporaryDirectory()
+    monkeypatch.setattr(adaptivefiltering.paths, "_tmp_dir", tmp_dir)
+    monkeypatch.setattr(adaptivefiltering.paths, "_file_owners", {})
+    monkeypatch.setattr(adaptivefiltering.paths, "_cache_files", OrderedDict())
+    monkeypatch.setattr(adaptivefiltering.paths, "_file_sizes", {})
+    monkeypatch.setattr(adaptivefiltering.paths, "_workspace_size", 0)
+    monkeypatch.setattr(adaptivefiltering.paths, "_collected_size", None)
+    yield tmp_dir.name
+    set_workspace_quota(None)
+    tmp_dir.cleanup()
+
+
+class Owner:
+    pass
+
+
+def write_file(filename, size):
+    with open(filename, "wb") as f:
+        f.write(b"\0" * size)
+    return filename
+
+
+def test_claim_temporary_file(workspace, tmp_path):
+    filename = write_file(get_temporary_filename(extension="las"), 100)
+
+    # The file is deleted once all of its owners are gone
+    first, second = Owner(), Owner()
+    claim_temporary_file(filename, first)
+    claim_temporary_file(filename, second)
+    del first
+    gc.collect()
+    assert os.path.exists(filename)
+    del second
+    gc.collect()
+    assert not os.path.exists(filename)
+
+    # Files outside the workspace are never deleted
+    outside = write_file(os.path.join(tmp_path, "data.las"), 100)
+    owner = Owner()
+    claim_temporary_file(outside, owner)
+    del owner
+    gc.collect()
+    assert os.path.exists(outside)
+
+
+def test_workspace_quota(workspace):
+    old = write_file(get_temporary_filename(), 100)
+    new = write_file(get_temporary_filename(), 100)
+    register_cache_file(old)
+    register_cache_file(new)
+
+    # Cache files are not deleted with their owners
+    owner = Owner()
+    claim_temporary_file(new, owner)
+    del owner
+    gc.collect()
+    assert os.path.exists(new)
+
+    owned = write_file(get_temporary_filename(), 100)
+    owner = Owner()
+    claim_temporary_file(owned, owner)
+    usage = workspace_usage()
+    assert usage["total"] == 300
+    assert usage["owned"] == 100
+    assert usage["cache"] == 200
+
+    # The least recently used cache file is evicted first
+    set_workspace_quota(200)
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+    assert workspace_usage()["quota"] == 200
+
+    # Owned files are never evicted
+    set_workspace_quota(50)
+    assert not os.path.exists(new)
+    assert os.path.exists(owned)
+    with pytest.raises(AdaptiveFilteringError):
+        get_temporary_filename()
+
+    # Releasing the owner frees the space
+    del owner
+    assert get_temporary_filename()
+    assert workspace_usage()["total"] == 0
+
+    # Intermediate files that are not claimed do not count towards the quota
+    write_file(get_temporary_filename(), 100)
+    assert get_temporary_filename()
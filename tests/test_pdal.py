@@ -1,10 +1,15 @@
+from adaptivefiltering.dataset import remove_classification, reproject_dataset
 from adaptivefiltering.pdal import *
 from adaptivefiltering.paths import get_temporary_filename
 
 from . import dataset, minimal_dataset
 
+import concurrent.futures
 import jsonschema
+import multiprocessing
+import numpy as np
 import os
+import platform
 import pyrsistent
 import pytest
 
@@ -98,3 +103,217 @@ def test_pdal_inmemory_dataset(minimal_dataset):
     saved = dataset.save(get_temporary_filename("laz"), compress=True)
     reloaded = PDALInMemoryDataSet.convert(saved)
     assert dataset.data.shape == reloaded.data.shape
+
+
+def test_pdal_pipeline_parallel(minimal_dataset):
+    pipeline = PDALFilter(type="filters.smrf").as_pipeline()
+    serial = pipeline.execute(minimal_dataset, workers=1)
+    x, y = serial.data["X"], serial.data["Y"]
+    tile_size = max(x.max() - x.min(), y.max() - y.min()) / 2
+    parallel = pipeline.execute(
+        minimal_dataset, workers=2, tile_size=tile_size, tile_buffer=tile_size / 2
+    )
+
+    # Buffer points are discarded, so no point is duplicated or lost, and
+    # the points are returned in their original order
+    assert parallel.data.shape == serial.data.shape
+    assert np.array_equal(parallel.data["X"], x)
+    assert np.array_equal(parallel.data["Y"], y)
+
+    # Away from the tile borders, the classification matches the serial run
+    dx = (x - x.min()) % tile_size
+    dy = (y - y.min()) % tile_size
+    interior = (np.minimum(dx, tile_size - dx) > tile_size / 4) & (
+        np.minimum(dy, tile_size - dy) > tile_size / 4
+    )
+    assert np.any(interior)
+    classification = parallel.data["Classification"][interior]
+    assert np.mean(classification == serial.data["Classification"][interior]) > 0.99
+
+    # The tiling configuration is recorded in the provenance
+    assert "2 worker processes" in parallel._provenance[-1]
+
+
+def test_pdal_inmemory_dataset_delta(minimal_dataset):
+    dataset = PDALInMemoryDataSet.convert(minimal_dataset)
+    filtered = PDALFilter(type="filters.smrf").execute(dataset)
+
+    # The filtered data set only stores the modified dimensions
+    delta = filtered.delta(dataset)
+    assert delta is not None
+    assert set(delta.keys()) <= {"Classification"}
+    assert np.shares_memory(filtered.dimension("X"), dataset.dimension("X"))
+    assert np.array_equal(filtered.data["X"], dataset.data["X"])
+    assert np.array_equal(
+        filtered.data["Classification"], filtered.dimension("Classification")
+    )
+
+    # The full array is only assembled once and the delta is kept
+    assert filtered.data is filtered.data
+    assert filtered.delta(dataset) is not None
+
+    # The data set can be reconstructed from its delta
+    restored = PDALInMemoryDataSet.from_delta(dataset, delta)
+    assert np.array_equal(restored.data, filtered.data)
+
+
+def test_pdal_inmemory_dataset_grid_index(minimal_dataset):
+    dataset = PDALInMemoryDataSet.convert(minimal_dataset)
+    filtered = PDALFilter(type="filters.smrf").execute(dataset)
+
+    # Filters that do not move points share the grid index with their input
+    assert filtered.grid_index(0.5) is dataset.grid_index(0.5)
+    assert filtered.cell_statistics(0.5) is not dataset.cell_statistics(0.5)
+    assert filtered.cell_statistics(0.5) is filtered.cell_statistics(0.5)
+
+
+def test_pdal_inmemory_dataset_spatial_index(minimal_dataset):
+    dataset = PDALInMemoryDataSet.convert(minimal_dataset)
+    index = dataset.spatial_index()
+    assert dataset.spatial_index() is index
+
+    # Filters that do not move points reuse the index of their input
+    filtered = PDALFilter(type="filters.smrf").execute(dataset)
+    assert filtered.spatial_index().grid is index.grid
+
+    # Data sets with new coordinates get a new index
+    shifted = dataset.data.copy()
+    shifted["X"] += 1.0
+    moved = PDALInMemoryDataSet(data=shifted, spatial_reference="EPSG:4326")
+    assert moved.spatial_index().grid is not index.grid
+
+
+def _synthetic_dataset(n):
+    """A synthetic data set, built without temporaries of the full size"""
+    data = np.zeros(
+        n,
+        dtype=[
+            ("X", np.float64),
+            ("Y", np.float64),
+            ("Z", np.float64),
+            ("Classification", np.uint8),
+        ],
+    )
+    for start in range(0, n, 1_000_000):
+        stop = min(start + 1_000_000, n)
+        i = np.arange(start, stop)
+        data["X"][start:stop] = 500000.0 + i % 10000
+        data["Y"][start:stop] = 5700000.0 + i // 10000
+    data["Classification"] = 2
+    return PDALInMemoryDataSet(data=data, spatial_reference="EPSG:25832")
+
+
+def _peak_memory_growth(helper, n):
+    """Measure the growth of the peak resident memory caused by a helper
+
+    This runs in a fresh process, so that the peak is not dominated by
+    earlier allocations. Resident memory includes PDAL's own point table.
+    """
+    from adaptivefiltering.segmentation import Map
+
+    import resource
+
+    dataset = _synthetic_dataset(n)
+    if helper == "remove_classification_derived":
+        derived = remove_classification(dataset)
+    if helper == "restrict":
+        segmentation = Map(dataset=dataset).load_hexbin_boundary(dataset=dataset)
+
+    helpers = {
+        "remove_classification": lambda: remove_classification(dataset),
+        "reproject_dataset": lambda: reproject_dataset(dataset, "EPSG:25833"),
+        "remove_classification_derived": lambda: remove_classification(derived),
+        "restrict": lambda: dataset.restrict(segmentation),
+        "load_hexbin_boundary": lambda: Map(dataset=dataset),
+    }
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    helpers[helper]()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # The maximum resident set size is reported in kilobytes on Linux
+    return (peak - baseline) * 1024, dataset.data.nbytes
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(platform.system() != "Linux", reason="Measures RSS on Linux")
+@pytest.mark.parametrize(
+    "helper, copies",
+    [
+        # PDAL copies the input into its point table and the result is extracted
+        # from that table. The pipeline is released before any further copy.
+        ("remove_classification", 2.25),
+        ("reproject_dataset", 2.25),
+        # A derived data set assembles its full array once for PDAL
+        ("remove_classification_derived", 3.25),
+        # A single copy of the selected points plus the spatial index
+        ("restrict", 1.75),
+        # The footprint is computed without copying the point data
+        ("load_hexbin_boundary", 0.75),
+    ],
+)
+def test_pdal_helpers_peak_memory(helper, copies):
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as executor:
+        growth, nbytes = executor.submit(
+            _peak_memory_growth, helper, 50_000_000
+        ).result()
+
+    assert growth < copies * nbytes
+
+
+def test_pdal_inmemory_dataset_projection(minimal_dataset):
+    full = PDALInMemoryDataSet.convert(minimal_dataset)
+    dimensions = ("X", "Y", "Z", "Classification")
+
+    # Chunked reading with projection yields the same points
+    projected = PDALInMemoryDataSet.convert(
+        minimal_dataset, dimensions=dimensions, chunk_size=100
+    )
+    assert set(projected.data.dtype.names) == set(dimensions)
+    for name in dimensions:
+        assert np.array_equal(projected.data[name], full.data[name])
+
+    # In-memory data sets can be projected as well
+    assert np.array_equal(full.project(dimensions).data, projected.data)
+
+    with pytest.raises(AdaptiveFilteringError):
+        full.project(("Foo",))
+
+
+def test_pdal_inmemory_dataset_select_points(minimal_dataset):
+    dataset = PDALInMemoryDataSet.convert(minimal_dataset)
+    mask = dataset.dimension("X") > np.median(dataset.dimension("X"))
+
+    selected = dataset.select_points(mask)
+    assert np.array_equal(selected.data, dataset.data[mask])
+    assert np.array_equal(
+        dataset.select_points(np.nonzero(mask)[0]).data, selected.data
+    )
+
+
+def test_pdal_filter_dimensions():
+    smrf = PDALFilter(type="filters.smrf")
+    assert "Classification" in smrf.dimensions()
+    assert "Intensity" not in smrf.dimensions()
+
+    outlier = PDALFilter(type="filters.outlier", method="statistical")
+    assert (smrf + outlier).dimensions() == smrf.dimensions()
+
+
+def test_pdal_inmemory_dataset_memory_map(minimal_dataset):
+    dataset = PDALInMemoryDataSet.convert(minimal_dataset)
+
+    # Explicit spilling into a memory-mapped file
+    spilled = dataset.spill()
+    assert isinstance(spilled._base, np.memmap)
+    assert np.array_equal(spilled.data, dataset.data)
+
+    # Automatic spilling of large data sets
+    set_memory_map_threshold(0)
+    try:
+        filtered = PDALFilter(type="filters.smrf").execute(minimal_dataset)
+        assert isinstance(filtered._base, np.memmap)
+        filtered.rasterize()
+    finally:
+        set_memory_map_threshold(None)
@@ -0,0 +1,94 @@
+from adaptivefiltering.rasterization import *
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+import numpy as np
+import pytest
+
+
+def _random_points(n=1000):
+    rng = np.random.default_rng(42)
+    return rng.random(n) * 10.0, rng.random(n) * 5.0, rng.random(n)
+
+
+def test_rasterize_points():
+    x, y, z = _random_points()
+    rasters, geotransform = rasterize_points(x, y, z, 1.0)
+    assert set(rasters.keys()) == set(BANDS)
+    assert rasters["min"].shape == (5, 10)
+
+    # Compare against a brute force evaluation
+    cells = cell_indices(x, y, rasters["min"].shape, geotransform)
+    for cell in np.unique(cells):
+        values = z[cells == cell]
+        assert np.isclose(rasters["min"].flat[cell], values.min())
+        assert np.isclose(rasters["max"].flat[cell], values.max())
+        assert np.isclose(rasters["mean"].flat[cell], values.mean())
+        assert np.isclose(rasters["stdev"].flat[cell], values.std())
+        assert rasters["count"].flat[cell] == values.shape[0]
+
+    # The first raster row is the northernmost one
+    assert cells[np.argmax(y)] // rasters["min"].shape[1] == 0
+
+
+def test_rasterize_no_points():
+    with pytest.raises(AdaptiveFilteringError):
+        rasterize_points(np.array([]), np.array([]), np.array([]), 1.0)
+
+
+def test_create_gdal_raster():
+    x, y, z = _random_points(100)
+    rasters, geotransform = rasterize_points(x, y, z, 0.5)
+    raster = create_gdal_raster(rasters, geotransform, spatial_reference="EPSG:25832")
+    assert raster.RasterCount == len(BANDS)
+    assert raster.GetGeoTransform() == geotransform
+    assert np.array_equal(raster.GetRasterBand(1).ReadAsArray(), rasters["min"])
+
+    # Filling removes all gaps in the interpolated bands
+    fill_nodata(raster)
+    assert np.all(raster.GetRasterBand(1).ReadAsArray() != NODATA)
+
+
+def test_cell_statistics():
+    x, y, z = _random_points()
+    classification = np.random.default_rng(0).integers(1, 6, x.shape[0])
+    index = GridIndex(x, y, 1.0)
+    statistics = CellStatistics(index, x, y, z, classification)
+
+    # The index groups the points by cell
+    assert np.all(index.cells[index.points(7)] == 7)
+    assert index.offsets[-1] == x.shape[0]
+
+    # Rasters for a subset of classes match a rasterization of that subset
+    for selection in [(2,), (1, 3, 5)]:
+        rasters = statistics.rasterize(selection)
+        mask = np.isin(classification, selection)
+        for cell in range(index.size):
+            values = z[mask & (index.cells == cell)]
+            if values.shape[0] == 0:
+                assert rasters["count"].flat[cell] == NODATA
+                continue
+            assert np.isclose(rasters["min"].flat[cell], values.min())
+            assert np.isclose(rasters["max"].flat[cell], values.max())
+            assert np.isclose(rasters["mean"].flat[cell], values.mean())
+            assert np.isclose(rasters["stdev"].flat[cell], values.std())
+            assert rasters["count"].flat[cell] == values.shape[0]
+
+    with pytest.raises(AdaptiveFilteringError):
+        statistics.rasterize((7,))
+
+
+def test_aggregate_rasters():
+    x, y, z = _random_points(500)
+    fine, _ = rasterize_points(x, y, z, 0.5)
+    coarse, _ = rasterize_points(x, y, z, 1.0)
+
+    # Aggregating the fine rasters reproduces a coarse rasterization
+    fine = {k: np.where(v == NODATA, np.nan, v) for k, v in fine.items()}
+    aggregated = aggregate_rasters(fine)
+    for name in ("min", "max", "mean", "count", "stdev"):
+        assert np.allclose(aggregated[name], coarse[name])
+
+    # Cells without data remain without data
+    aggregated = aggregate_rasters({"band1": np.full((3, 3), np.nan)})
+    assert aggregated["band1"].shape == (2, 2)
+    assert np.all(aggregated["band1"] == NODATA)
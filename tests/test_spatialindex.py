@@ -0,0 +1,54 @@
+from adaptivefiltering.clipping import PolygonIndex
+from adaptivefiltering.rasterization import GridIndex
+from adaptivefiltering.spatialindex import *
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(42)
+    return rng.uniform(0, 100, 10000), rng.uniform(0, 50, 10000)
+
+
+@pytest.fixture
+def index(points):
+    x, y = points
+    bounds = (x.min(), x.max(), y.min(), y.max())
+    return SpatialIndex(x, y, GridIndex(x, y, default_resolution(bounds, x.shape[0])))
+
+
+def test_query_bbox(points, index):
+    x, y = points
+    expected = np.flatnonzero((x >= 10) & (x <= 30.5) & (y >= 5) & (y <= 20))
+    assert np.array_equal(index.query_bbox((10, 30.5, 5, 20)), expected)
+
+    # Boxes outside the grid and covering the grid
+    assert index.query_bbox((200, 300, 0, 10)).shape[0] == 0
+    assert index.query_bbox((-1e6, 1e6, -1e6, 1e6)).shape[0] == x.shape[0]
+
+
+def test_query_radius(points, index):
+    x, y = points
+    expected = np.flatnonzero(np.hypot(x - 40, y - 25) <= 12.5)
+    assert np.array_equal(index.query_radius(40, 25, 12.5), expected)
+
+
+def test_query_polygon(points, index):
+    x, y = points
+    geometries = [
+        {"type": "Polygon", "coordinates": [[[10, 10], [30, 10], [20, 40], [10, 10]]]},
+        {"type": "Polygon", "coordinates": [[[25, 5], [90, 5], [90, 15], [25, 5]]]},
+    ]
+
+    # The index only prefilters, so the results match an unindexed test
+    polygons = PolygonIndex(geometries)
+    for actual, expected in zip(
+        index.query_memberships(geometries), polygons.memberships(x, y)
+    ):
+        assert np.array_equal(actual, expected)
+    assert np.array_equal(index.query_labels(geometries), polygons.labels(x, y))
+    assert np.array_equal(
+        index.query_polygon(geometries), np.flatnonzero(polygons.contains(x, y))
+    )
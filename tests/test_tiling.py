@@ -0,0 +1,76 @@
+from adaptivefiltering.filter import Pipeline
+from adaptivefiltering.paths import get_temporary_workspace
+from adaptivefiltering.pdal import PDALFilter, PDALInMemoryDataSet
+from adaptivefiltering.tiling import *
+from adaptivefiltering.utils import AdaptiveFilteringError
+
+from . import dataset, minimal_dataset
+
+import numpy as np
+import os
+import pytest
+import shutil
+
+_pdal_cli_present = shutil.which("pdal") is not None
+
+
+def test_split_into_tiles_arguments(minimal_dataset):
+    with pytest.raises(AdaptiveFilteringError):
+        split_into_tiles(minimal_dataset, 0.0)
+
+    with pytest.raises(AdaptiveFilteringError):
+        split_into_tiles(minimal_dataset, 1.0, tile_buffer=-1.0)
+
+
+@pytest.mark.skipif(not _pdal_cli_present, reason="PDAL CLI not found.")
+def test_split_into_tiles(minimal_dataset):
+    minx, maxx, miny, maxy = dataset_bounds(minimal_dataset)
+    tiles = split_into_tiles(minimal_dataset, (maxx - minx) / 2, tile_buffer=0.0)
+    assert len(tiles) >= 2
+
+    # Without buffer, the tiles partition the data set
+    total = sum(PDALInMemoryDataSet.convert(t).data.shape[0] for _, t in tiles)
+    assert total == PDALInMemoryDataSet.convert(minimal_dataset).data.shape[0]
+
+
+@pytest.mark.skipif(not _pdal_cli_present, reason="PDAL CLI not found.")
+def test_tiled_pipeline_single_tile(minimal_dataset):
+    pipeline = Pipeline(filters=[PDALFilter(type="filters.smrf")])
+
+    # A single tile covering the whole data set reproduces the monolithic run
+    minx, maxx, miny, maxy = dataset_bounds(minimal_dataset)
+    size = 2 * max(maxx - minx, maxy - miny) + 1.0
+    tiled = PDALInMemoryDataSet.convert(
+        pipeline.execute(minimal_dataset, tile_size=size)
+    )
+    monolithic = PDALInMemoryDataSet.convert(pipeline.execute(minimal_dataset))
+
+    assert tiled.data.shape == monolithic.data.shape
+    assert np.array_equal(
+        np.bincount(tiled.data["Classification"]),
+        np.bincount(monolithic.data["Classification"]),
+    )
+
+
+@pytest.mark.skipif(not _pdal_cli_present, reason="PDAL CLI not found.")
+def test_tiled_pipeline_cleanup(minimal_dataset):
+    minx, maxx, miny, maxy = dataset_bounds(minimal_dataset)
+    workspace = get_temporary_workspace()
+    before = set(os.listdir(workspace))
+
+    # Only the stitched result remains in the workspace
+    result = execute_tiled(
+        PDALFilter(type="filters.smrf"), minimal_dataset, (maxx - minx) / 2
+    )
+    assert set(os.listdir(workspace)) - before == {os.path.basename(result.filename)}
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not _pdal_cli_present, reason="PDAL CLI not found.")
+def test_tiled_pipeline(dataset):
+    pipeline = Pipeline(filters=[PDALFilter(type="filters.smrf")])
+    tiled = PDALInMemoryDataSet.convert(pipeline.execute(dataset, tile_size=100.0))
+    monolithic = PDALInMemoryDataSet.convert(pipeline.execute(dataset))
+
+    # Buffer points are discarded, so no point is duplicated or lost
+    assert tiled.data.shape == monolithic.data.shape
@@ -0,0 +1,138 @@
+from adaptivefiltering.paths import get_temporary_workspace
+from adaptivefiltering.visualization import *
+
+from . import dataset
+
+from osgeo import gdal
+
+import gc
+import numpy as np
+import os
+import pytest
+
+
+def _plane(a, b, shape=(8, 9), resolution=0.5):
+    geotransform = (0.0, resolution, 0.0, 10.0, 0.0, -resolution)
+    x = (np.arange(shape[1]) + 0.5) * resolution
+    y = 10.0 - (np.arange(shape[0]) + 0.5) * resolution
+    x, y = np.meshgrid(x, y)
+    return a * x + b * y, geotransform
+
+
+def test_slope():
+    values, geotransform = _plane(0.3, -0.7)
+    result = slope(values, geotransform)
+    expected = np.degrees(np.arctan(np.hypot(0.3, -0.7)))
+    assert np.allclose(result[1:-1, 1:-1], expected)
+
+    # The border has no neighborhood and is marked as missing
+    assert np.all(result[0, :] == -9999.0)
+
+
+def test_hillshade():
+    # A flat surface is lit according to the sun's altitude only
+    values, geotransform = _plane(0.0, 0.0)
+    result = hillshade(values, geotransform, altitude=30)
+    assert np.all(result[1:-1, 1:-1] == 128)
+    assert np.all(result[0, :] == 0)
+
+    # Cells next to missing data are marked as missing
+    values[4, 4] = -9999.0
+    result = hillshade(values, geotransform, nodata=-9999.0)
+    assert np.all(result[3:6, 3:6] == 0)
+    assert result[2, 2] == 128
+
+    # Both gradient algorithms agree on a plane
+    values, geotransform = _plane(0.3, -0.7)
+    assert np.array_equal(
+        hillshade(values, geotransform),
+        hillshade(values, geotransform, alg="ZevenbergenThorne"),
+    )
+
+
+def _gdaldem(values, geotransform, processing, **options):
+    """Run gdaldem on an elevation raster"""
+    driver = gdal.GetDriverByName("MEM")
+    raster = driver.Create("", values.shape[1], values.shape[0], 1, gdal.GDT_Float64)
+    raster.SetGeoTransform(geotransform)
+    raster.GetRasterBand(1).WriteArray(values)
+    result = gdal.DEMProcessing("", raster, processing, format="MEM", **options)
+    return result.GetRasterBand(1).ReadAsArray()
+
+
+@pytest.mark.parametrize("alg", ["Horn", "ZevenbergenThorne"])
+def test_compare_gdaldem(alg):
+    # A surface with varying slope and aspect
+    values, geotransform = _plane(0.0, 0.0, shape=(40, 50))
+    y, x = np.mgrid[0:40, 0:50] * 0.5
+    values = values + 3.0 * np.sin(0.4 * x) * np.cos(0.3 * y) + 0.2 * x
+
+    for azimuth, altitude in ((315, 45), (90, 30)):
+        expected = _gdaldem(
+            values,
+            geotransform,
+            "hillshade",
+            alg=alg,
+            azimuth=azimuth,
+            altitude=altitude,
+        )
+        result = hillshade(
+            values, geotransform, alg=alg, azimuth=azimuth, altitude=altitude
+        )
+        assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+
+    expected = _gdaldem(values, geotransform, "slope", alg=alg)
+    result = slope(values, geotransform, alg=alg)
+    assert np.allclose(result[1:-1, 1:-1], expected[1:-1, 1:-1], atol=1e-3)
+
+
+def test_render_visualization_in_memory(dataset):
+    model = dataset.rasterize(resolution=5.0)
+    before = set(os.listdir(get_temporary_workspace()))
+    for vis_type in ("hillshade", "slope"):
+        png = render_visualization(model.raster, visualization_type=vis_type)
+        assert png.startswith(b"\x89PNG")
+
+    # Rendering does not write any files
+    assert set(os.listdir(get_temporary_workspace())) == before
+
+
+def test_normalize_visualization_options():
+    options = normalize_visualization_options({"visualization_type": "hillshade"})
+    assert options["azimuth"] == 315
+    assert options == normalize_visualization_options(
+        {"visualization_type": "hillshade", "azimuth": 315}
+    )
+    assert normalize_visualization_options({"visualization_type": "slope"}) == {
+        "visualization_type": "slope"
+    }
+
+
+def test_render_cache(dataset):
+    model = dataset.rasterize(resolution=5.0)
+    clear_render_cache()
+
+    png = model.render(visualization_type="hillshade")
+    assert render_cache_info().misses == 1
+
+    # Explicitly passing default options hits the cache
+    assert model.render(visualization_type="hillshade", azimuth=315) is png
+    assert render_cache_info().hits == 1
+
+    # Different options are rendered separately
+    assert model.render(visualization_type="hillshade", azimuth=90) != png
+    assert render_cache_info().misses == 2
+
+
+def test_render_cache_does_not_own_rasters(dataset):
+    from adaptivefiltering.dataset import DigitalSurfaceModel
+
+    clear_render_cache()
+    model = DigitalSurfaceModel(dataset, resolution=5.0)
+    model.render(visualization_type="hillshade", display_size=None)
+    assert render_cache_info().currsize == 1
+
+    # Freeing the model frees the raster and its cached images
+    del model
+    gc.collect()
+    assert render_cache_info().currsize == 0